@@ -1,6 +1,8 @@
 import json
 import pymongo
 
+from data.helpers import upsert, stamped
+from data.write_buffer import WriteBuffer
 from realms.datastores.events_db import EventsStore
 
 
@@ -43,13 +45,16 @@ class MongoDatabase(EventsStore):
         self.db = self.client["Crunchy"]
         self.characters = self.db["collected_characters"]
         self.parties = self.db["parties"]
+        self.write_buffer = WriteBuffer({'characters': self.characters})
         super().__init__(self.db)
 
     def close_conn(self):
-        """ Logs us out of the data """
+        """ Flushes any buffered writes and logs us out of the data """
+        self.write_buffer.flush()
         self.db.logout()
 
     def get_characters(self, user_id: int):
+        self.write_buffer.flush_key('characters', user_id)
         resp = self.characters.find_one({'_id': user_id})
         return resp if resp is not None else {
             '_id': user_id,
@@ -57,30 +62,31 @@ class MongoDatabase(EventsStore):
             'rank': {'ranking': 0, 'power': 0, 'total_character': 0}
         }
 
+    def has_characters(self, user_id: int) -> bool:
+        self.write_buffer.flush_key('characters', user_id)
+        return self.characters.find_one({'_id': user_id}, {'_id': 1}) is not None
+
     def update_any(self, user_id: int, **kwargs):
-        if self.characters.find_one({'_id': user_id}) is not None:
-            return self.characters.find_one_and_update({'_id': user_id}, {'$set': kwargs})
-        else:
-            return self.characters.insert_one({'_id': user_id}, **kwargs)
+        self.write_buffer.queue('characters', user_id, {'$set': kwargs})
 
     def update_characters(self, user_id: int, characters: list):
-        return self.characters.find_one_and_update({'_id': user_id}, {'$set': {'characters': characters}})
+        self.write_buffer.queue('characters', user_id, {'$set': {'characters': characters}}, upsert=False)
 
     def add_characters(self, user_id: int, data: dict):
-        self.characters.insert_one({'_id': user_id, **data})
+        self.write_buffer.flush_key('characters', user_id)
+        # Upserted rather than inserted so it carries the same `updated_at` stamp as every other write
+        self.characters.update_one({'_id': user_id}, stamped({'$setOnInsert': data}), upsert=True)
 
     def update_rank(self, user_id: int, rank: dict):
-        return self.characters.find_one_and_update({'_id': user_id}, {'$set': {'rank': rank}})
+        self.write_buffer.queue('characters', user_id, {'$set': {'rank': rank}}, upsert=False)
 
     def reset_characters(self, user_id: int):
+        self.write_buffer.flush_key('characters', user_id)
         return self.characters.find_one_and_delete({'_id': user_id})
 
     # Parties area
     def update_any_party(self, user_id: int, **kwargs):
-        if self.parties.find_one({'_id': user_id}) is not None:
-            return self.parties.find_one_and_update({'_id': user_id}, {'$set': kwargs})
-        else:
-            return self.parties.insert_one({'_id': user_id, **kwargs})
+        return upsert(self.parties, user_id, kwargs)
 
     def get_party(self, user_id: int):
         return self.parties.find_one({'_id': user_id})
@@ -0,0 +1,132 @@
+"""
+    Runs the bot as several processes (clusters) instead of one AutoShardedBot holding every
+    shard, each cluster gets its own event loop, thread pool and Mongo connection pool.
+    The supervisor restarts clusters that die, backing off exponentially while one keeps
+    crashing, forwards SIGTERM so every cluster shuts down cleanly and keeps a shared
+    array of guild counts so cluster 0 can post the combined server count to top.gg.
+    + Usage:
+        - set "cluster_count" in config.json
+        - python cluster.py
+"""
+import json
+import multiprocessing
+import signal
+import time
+
+from logger import Logger
+
+with open('config.json', 'r') as file:
+    config = json.load(file)
+
+SHARD_COUNT = config.get("shard_count")
+CLUSTER_COUNT = config.get("cluster_count", 1)
+IDENTIFY_DELAY = 5  # Seconds Discord wants between shard identifies
+CHECK_INTERVAL = 5
+RESTART_BACKOFF = 5  # Seconds before the first restart, doubled for every crash in a row
+MAX_RESTART_BACKOFF = 15 * 60
+STABLE_AFTER = 10 * 60  # A cluster up this long has its crash count reset
+SHUTDOWN_TIMEOUT = 30  # Seconds clusters get to flush and log out before they are killed
+
+
+def split_shards(shard_count: int, cluster_count: int) -> list:
+    """ Splits the shard ids into `cluster_count` contiguous groups of near equal size """
+    per_cluster, extra = divmod(shard_count, cluster_count)
+    groups, start = [], 0
+    for cluster_id in range(cluster_count):
+        end = start + per_cluster + (1 if cluster_id < extra else 0)
+        groups.append(list(range(start, end)))
+        start = end
+    return groups
+
+
+def run_cluster(cluster_id: int, shard_ids: list, guild_counts):
+    """ Entry point of a cluster process, main is only imported here so the supervisor stays light """
+    import main
+    main.run(shard_ids=shard_ids, cluster_id=cluster_id, guild_counts=guild_counts)
+
+
+class Supervisor:
+    def __init__(self, shard_count: int, cluster_count: int):
+        self.context = multiprocessing.get_context('spawn')
+        if shard_count is None:  # Discord picks the shard count, can't split what we don't know
+            self.shard_groups = [None]
+        else:
+            self.shard_groups = split_shards(shard_count, min(cluster_count, shard_count))
+        self.guild_counts = self.context.Array('q', len(self.shard_groups))
+        self.clusters = {}
+        self.started_at = {}
+        self.failures = {}
+        self.restart_at = {}  # cluster_id -> monotonic time a crashed cluster may start again
+        self.stopping = False
+
+    def launch(self, cluster_id: int):
+        shard_ids = self.shard_groups[cluster_id]
+        self.guild_counts[cluster_id] = 0
+        process = self.context.Process(target=run_cluster, name=f"cluster-{cluster_id}",
+                                       args=(cluster_id, shard_ids, self.guild_counts))
+        process.start()
+        self.clusters[cluster_id] = process
+        self.started_at[cluster_id] = time.monotonic()
+        Logger.log_info(f"Started cluster {cluster_id} (pid {process.pid}) with shards {shard_ids}")
+
+    def _stop(self, signum, frame):
+        self.stopping = True
+
+    def check(self):
+        """ Restarts dead clusters, a crash loop (bad token, failed identify) waits longer every time """
+        now = time.monotonic()
+        for cluster_id, process in list(self.clusters.items()):
+            if process.is_alive():
+                continue
+            if cluster_id not in self.restart_at:
+                if now - self.started_at[cluster_id] >= STABLE_AFTER:
+                    self.failures[cluster_id] = 0
+                failures = self.failures[cluster_id] = self.failures.get(cluster_id, 0) + 1
+                delay = min(RESTART_BACKOFF * 2 ** (failures - 1), MAX_RESTART_BACKOFF)
+                self.restart_at[cluster_id] = now + delay
+                Logger.log_info(f"Cluster {cluster_id} exited with code {process.exitcode}, "
+                                f"restarting in {delay}s", error=True)
+            elif now >= self.restart_at[cluster_id]:
+                del self.restart_at[cluster_id]
+                self.launch(cluster_id)
+
+    def shutdown(self):
+        """ SIGTERM to every cluster, the bot's own handler closes it and flushes buffered writes """
+        for process in self.clusters.values():
+            if process.is_alive():
+                process.terminate()
+        deadline = time.monotonic() + SHUTDOWN_TIMEOUT
+        for cluster_id, process in self.clusters.items():
+            process.join(max(deadline - time.monotonic(), 0))
+            if process.is_alive():
+                Logger.log_info(f"Cluster {cluster_id} didn't stop in {SHUTDOWN_TIMEOUT}s, killing it", error=True)
+                process.kill()
+                process.join()
+
+    def _wait(self, seconds: float):
+        """ Sleeps in short steps so a SIGTERM is acted on straight away """
+        end = time.monotonic() + seconds
+        while not self.stopping and time.monotonic() < end:
+            time.sleep(min(0.5, end - time.monotonic()))
+
+    def run(self):
+        signal.signal(signal.SIGTERM, self._stop)
+        try:
+            for cluster_id, shard_ids in enumerate(self.shard_groups):
+                if self.stopping:
+                    break
+                self.launch(cluster_id)
+                # Let this cluster identify its shards before the next one starts
+                self._wait(len(shard_ids or []) * IDENTIFY_DELAY)
+
+            while not self.stopping:
+                self._wait(CHECK_INTERVAL)
+                if not self.stopping:
+                    self.check()
+        except KeyboardInterrupt:
+            pass
+        self.shutdown()
+
+
+if __name__ == "__main__":
+    Supervisor(SHARD_COUNT, CLUSTER_COUNT).run()
@@ -1,5 +1,29 @@
+import asyncio
+import discord
+import io
+import threading
+import time
+
 from discord.ext import commands
 from data.database import MongoDatabase
+from profiler import Profiler
+from utils.sampling_profiler import StackSampler
+
+FIELD_LIMIT = 1024  # Discord's max characters in an embed field value
+
+
+def field_value(lines: list) -> str:
+    """ Joins lines for an embed field, what doesn't fit is cut to an `... and N more` line """
+    value = "\n".join(lines)
+    if len(value) <= FIELD_LIMIT:
+        return value or "None"
+    kept, size = [], 0
+    for line in lines:
+        if size + len(line) + 1 > FIELD_LIMIT - 32:  # Room left for the `... and N more` line
+            break
+        kept.append(line)
+        size += len(line) + 1
+    return "\n".join(kept + [f"... and {len(lines) - len(kept)} more"])
 
 
 class OwnerCommands(commands.Cog):
@@ -20,6 +44,65 @@ class OwnerCommands(commands.Cog):
         except Exception as e:
             await ctx.send(str(e))
 
+    @commands.is_owner()
+    @commands.command(name="profile")
+    async def sample_profile(self, ctx, seconds: int = 10):
+        """ Samples the event loop's stack for a few seconds and uploads a collapsed stack file """
+        seconds = max(1, min(seconds, 120))
+        sampler = StackSampler(threading.get_ident())
+        await ctx.send(f"Sampling the event loop for {seconds}s...")
+        await asyncio.get_event_loop().run_in_executor(None, sampler.run, seconds)
+
+        if not sampler.samples:
+            return await ctx.send("No samples were taken.")
+        attribution = "\n".join(f"{cog}: {count / sampler.samples:.1%}" for cog, count in sampler.cogs.most_common())
+        file = discord.File(io.BytesIO(sampler.collapsed().encode('utf-8')),
+                            filename=f"crunchy-{self.bot.cluster_id}-{int(time.time())}.collapsed.txt")
+        await ctx.send(f"{sampler.samples} samples, open with speedscope or flamegraph.pl\n"
+                       f"```\n{attribution[:1800]}\n```", file=file)
+
+    @commands.is_owner()
+    @commands.command(name="perf")
+    async def performance(self, ctx, top: int = 10):
+        """ Loop lag, shard latency, executor backlog and the slowest commands of this process """
+        stats = self.bot.instrumentation
+        embed = discord.Embed(title=f"Cluster {self.bot.cluster_id} performance", color=self.bot.colour)
+        embed.add_field(name="Event loop",
+                        value=f"Lag: {stats.last_lag * 1000:.1f}ms (max {stats.max_lag * 1000:.1f}ms)\n"
+                              f"p99: {stats.loop_lag.quantile(0.99) * 1000:.0f}ms\n"
+                              f"Executor queue: {stats.executor_queue_depth()}\n"
+                              f"Write buffer: {self.bot.database.write_buffer.pending}",
+                        inline=False)
+        embed.add_field(name="Shards",
+                        value=field_value([f"{shard_id}: {latency * 1000:.0f}ms"
+                                           for shard_id, latency in stats.shard_latencies()]),
+                        inline=False)
+        embed.add_field(name="Cache (entries, hit rate)",
+                        value=field_value([f"{name}: {s['entries']}, {s['hit_rate']:.1%}"
+                                           for name, s in self.bot.cache.stats().items()]),
+                        inline=False)
+        slowest = sorted(stats.commands.items(), key=lambda item: item[1].quantile(0.95), reverse=True)[:top]
+        embed.add_field(name="Commands (p50 / p95 / p99, calls, errors)",
+                        value=field_value([f"`{name}` {h.quantile(0.5) * 1000:.0f} / {h.quantile(0.95) * 1000:.0f} / "
+                                           f"{h.quantile(0.99) * 1000:.0f}ms, {h.count}, "
+                                           f"{stats.command_errors.get(name, 0)}"
+                                           for name, h in slowest]),
+                        inline=False)
+        await ctx.send(embed=embed)
+
+    @commands.is_owner()
+    @commands.command(name="timings")
+    async def timings(self, ctx, top: int = 15, reset: bool = False):
+        """ Slowest profiled functions by p95, pass reset to start a fresh window, commands are in `perf` """
+        summaries = sorted(Profiler.summaries().items(), key=lambda item: item[1]['p95_ms'], reverse=True)
+        lines = [f"{name}: {s['p50_ms']:.1f} / {s['p95_ms']:.1f} / {s['p99_ms']:.1f}ms, "
+                 f"{s['calls']} calls, {s['errors']} errors"
+                 for name, s in summaries[:top] if s['calls']]
+        text = "\n".join(lines) or "Nothing recorded yet."
+        await ctx.send(f"```\np50 / p95 / p99\n{text[:1900]}\n```")
+        if reset:
+            Profiler.reset()
+
 def setup(bot):
     bot.add_cog(OwnerCommands(bot))
 
@@ -12,7 +12,7 @@ class Customisations(commands.Cog):
     async def set_prefix(self, ctx, *, prefix: str):
         """ Set a new prefix """
         config: GuildConfig = ctx.guild_config
-        config.set_prefix(prefix)
+        await self.bot.async_database.run(config.set_prefix, prefix)
         self.bot.cache.store('guilds', ctx.guild.id, config)
         await ctx.send(f"<:HimeHappy:677852789074034691> My prefix is now `{config.prefix}`")
 
@@ -22,7 +22,7 @@ class Customisations(commands.Cog):
     async def reset_prefix(self, ctx):
         """ If you wanna go back to default """
         config: GuildConfig = ctx.config
-        new = config.reset_prefix()
+        new = await self.bot.async_database.run(config.reset_prefix)
         self.bot.cache.store('guilds', ctx.guild.id, config)
         await ctx.send(f"<:HimeHappy:677852789074034691> My prefix is now back to `{new}` **(default)**")
 
@@ -32,7 +32,7 @@ class Customisations(commands.Cog):
     async def toggle_nsfw(self, ctx):
         """ Set a new prefix """
         config: GuildConfig = ctx.guild_config
-        new = config.toggle_nsfw()
+        new = await self.bot.async_database.run(config.toggle_nsfw)
         self.bot.cache.store('guilds', ctx.guild.id, config)
         await ctx.send(f"<:HimeHappy:677852789074034691> NSFW is now {'enabled.' if new else 'disabled.'}")
 
@@ -78,7 +78,8 @@ class LiveFeedCommands(commands.Cog):
                 if choice:
                     await message.delete()
                     to_edit = await ctx.send("<:cheeky:717784139226546297> One moment...")
-                    guild_data: GuildWebhooks = GuildWebhooks(guild_id=ctx.guild.id, database=self.bot.database)
+                    guild_data: GuildWebhooks = await self.bot.async_database.run(
+                        GuildWebhooks, guild_id=ctx.guild.id, database=self.bot.database)
                     webhook = hook
                 else:
                     return
@@ -88,7 +89,8 @@ class LiveFeedCommands(commands.Cog):
                     f"Please delete the webhook manually if you haven't already.")
         else:
             to_edit = await ctx.send("<:cheeky:717784139226546297> One moment...")
-            guild_data: GuildWebhooks = GuildWebhooks(guild_id=ctx.guild.id, database=self.bot.database)
+            guild_data: GuildWebhooks = await self.bot.async_database.run(
+                GuildWebhooks, guild_id=ctx.guild.id, database=self.bot.database)
             try:
                 webhook = await self.make_webhook(channel=channel, feed_type="releases")
             except discord.Forbidden:
@@ -99,7 +101,7 @@ class LiveFeedCommands(commands.Cog):
                     content="Sorry but something went wrong when trying to make this webhook."
                             " Please try a different channel.")
 
-        guild_data.add_webhook(webhook=webhook, feed_type="releases")
+        await self.bot.async_database.run(guild_data.add_webhook, webhook=webhook, feed_type="releases")
         await webhook.send(content=random.choice(RANDOM_EMOJIS) + "Hello world! *phew* i got through!")
         return await to_edit.edit(content=f'All set! I will now send releases to <#{webhook.channel_id}>')
 
@@ -124,7 +126,8 @@ class LiveFeedCommands(commands.Cog):
                 if choice:
                     await message.delete()
                     to_edit = await ctx.send("<:cheeky:717784139226546297> One moment...")
-                    guild_data: GuildWebhooks = GuildWebhooks(guild_id=ctx.guild.id, database=self.bot.database)
+                    guild_data: GuildWebhooks = await self.bot.async_database.run(
+                        GuildWebhooks, guild_id=ctx.guild.id, database=self.bot.database)
                     webhook = hook
                 else:
                     return
@@ -134,7 +137,8 @@ class LiveFeedCommands(commands.Cog):
                     f"Please delete the webhook manually if you haven't already.")
         else:
             to_edit = await ctx.send("<:cheeky:717784139226546297> One moment...")
-            guild_data: GuildWebhooks = GuildWebhooks(guild_id=ctx.guild.id, database=self.bot.database)
+            guild_data: GuildWebhooks = await self.bot.async_database.run(
+                GuildWebhooks, guild_id=ctx.guild.id, database=self.bot.database)
             try:
                 webhook = await self.make_webhook(channel=channel, feed_type="news")
             except discord.Forbidden:
@@ -145,7 +149,7 @@ class LiveFeedCommands(commands.Cog):
                     content="Sorry but something went wrong when trying to make this webhook."
                             " Please try a different channel.")
 
-        guild_data.add_webhook(webhook=webhook, feed_type="news")
+        await self.bot.async_database.run(guild_data.add_webhook, webhook=webhook, feed_type="news")
         await webhook.send(content=random.choice(RANDOM_EMOJIS) + "Hello world! *phew* i got through!")
         return await to_edit.edit(content=f'All set! I will now send news to <#{webhook.channel_id}>')
 
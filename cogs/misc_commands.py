@@ -1,8 +1,9 @@
 import discord
-import aiohttp
 import random
 
-from discord.ext import commands
+from discord.ext import commands, tasks
+
+from logger import Logger
 
 BASE_URL = "https://crunchy-bot.live/api"
 RANDOM_THUMBS = [
@@ -16,24 +17,44 @@ RANDOM_THUMBS = [
 class Misc(commands.Cog):
     def __init__(self, bot):
         self.bot = bot
+        self.daily_picks = None  # Embed built from the last good /anime/daily response
+        self.refresh_daily_picks.start()
 
-    @commands.command(name="todayspicks", aliases=['picks', 'dailyanime', 'tp'])
-    async def anime_details(self, ctx):
-        async with aiohttp.ClientSession() as sess:
-            async with sess.get(f"{BASE_URL}/anime/daily") as resp:
-                if resp.status != 200:
-                    return await ctx.send("<:HimeSad:676087829557936149> Oh no! Something seems to have gone wrong,"
-                                          " please try again later.")
-                else:
-                    listed_items = await resp.json()
+    def cog_unload(self):
+        self.refresh_daily_picks.cancel()
+
+    async def fetch_daily_picks(self):
+        async with self.bot.http_session.get(f"{BASE_URL}/anime/daily") as resp:
+            resp.raise_for_status()
+            listed_items = await resp.json()
 
         embed = discord.Embed(color=self.bot.colour)
         for i, anime in enumerate(listed_items):
             url_safe = anime.get('title').replace(" ", "-").replace(".", "").replace(":", "")
             url = "https://www.crunchyroll.com/{}".format(url_safe)
             embed.add_field(name="\u200b", value=f"**{i + 1} ) - [{anime.get('title')}]({url})**", inline=False)
-        embed.set_thumbnail(url=random.choice(RANDOM_THUMBS))
         embed.set_footer(text="Part of Crunchy, Powered by CF8")
+        self.daily_picks = embed
+
+    @tasks.loop(minutes=30)
+    async def refresh_daily_picks(self):
+        """ The list changes once a day, a failed refresh keeps serving the last good copy """
+        try:
+            await self.fetch_daily_picks()
+        except Exception as e:
+            Logger.log_info(f"Failed to refresh today's picks: {e}", error=True)
+
+    @commands.command(name="todayspicks", aliases=['picks', 'dailyanime', 'tp'])
+    async def anime_details(self, ctx):
+        if self.daily_picks is None:
+            try:
+                await self.fetch_daily_picks()
+            except Exception:
+                return await ctx.send("<:HimeSad:676087829557936149> Oh no! Something seems to have gone wrong,"
+                                      " please try again later.")
+
+        embed = self.daily_picks.copy()
+        embed.set_thumbnail(url=random.choice(RANDOM_THUMBS))
         embed.set_author(name="Today's Anime Picks!", icon_url=ctx.author.avatar_url)
         return await ctx.send(embed=embed)
 
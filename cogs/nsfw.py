@@ -1,40 +1,95 @@
-import aiohttp
 import asyncio
 import discord
+import time
 
+from collections import deque
 from discord.ext import commands
 
+from logger import Logger
+
 
 CRUNCHY_API_BASE = "https://crunchy-bot.live/api"
 NEKO_API_BASE = "https://nekobot.xyz/api"  # todo replace with Crunchy api
 THUMB_IMG = "https://cdn.discordapp.com/emojis/717784142053507082.png?v=1"
+POOL_SIZE = 5  # Results kept ready per neko type / crunchy tag
+REQUEST_SPACING = 0.25  # Minimum seconds between two requests to the same api
 
 
 class ApiCollectors:
-    def __init__(self):
-        self.session = None
-        asyncio.get_event_loop().create_task(self.activate())
+    """
+        Keeps POOL_SIZE results per known neko type / crunchy tag fetched ahead of time,
+        commands take one from the pool without waiting on the api and the pool is topped
+        back up in the background. Types and tags that aren't pooled are fetched directly.
+    """
 
-    async def activate(self):
-        self.session = aiohttp.ClientSession()
+    def __init__(self, bot, neko_types=(), crunchy_tags=(), pool_size=POOL_SIZE):
+        self.bot = bot
+        self.pool_size = pool_size
+        self.pools = {('neko', type_): deque() for type_ in neko_types}
+        self.pools.update({('crunchy', 'hentai', tag): deque() for tag in crunchy_tags})
+        self._refilling = set()
+        self._rate_locks = {'neko': asyncio.Lock(), 'crunchy': asyncio.Lock()}
+        self._last_request = {'neko': 0.0, 'crunchy': 0.0}
+
+    @property
+    def session(self):
+        return self.bot.http_session
+
+    async def prefill(self):
+        await self.bot.wait_until_ready()
+        for key in self.pools:
+            self._schedule_refill(key)
+
+    async def _fetch(self, key):
+        api = key[0]
+        async with self._rate_locks[api]:
+            wait = self._last_request[api] + REQUEST_SPACING - time.monotonic()
+            if wait > 0:
+                await asyncio.sleep(wait)
+            self._last_request[api] = time.monotonic()
+
+        if api == 'neko':
+            url = NEKO_API_BASE + f"/image?type={key[1]}"
+        else:
+            url = CRUNCHY_API_BASE + f"/nsfw/{key[1]}"
+            if key[2] is not None:
+                url += f"?tag={key[2]}"
+        async with self.session.get(url) as r:
+            r.raise_for_status()
+            return await r.json()
+
+    def _schedule_refill(self, key):
+        if key not in self._refilling and len(self.pools[key]) < self.pool_size:
+            self._refilling.add(key)
+            self.bot.loop.create_task(self._refill(key))
+
+    async def _refill(self, key):
+        pool = self.pools[key]
+        try:
+            while len(pool) < self.pool_size:
+                pool.append(await self._fetch(key))
+        except Exception as e:  # Tried again the next time the pool is used
+            Logger.log_info(f"Failed to refill NSFW pool {key}: {e}", error=True)
+        finally:
+            self._refilling.discard(key)
+
+    async def _take(self, key):
+        pool = self.pools.get(key)
+        if pool is None:
+            return await self._fetch(key)
+        result = pool.popleft() if pool else await self._fetch(key)
+        self._schedule_refill(key)
+        return result
 
     async def get_from_neko(self, type_):
-        async with self.session.get((NEKO_API_BASE + f"/image?type={type_}")) as r:
-            result = await r.json()
-            return result
+        return await self._take(('neko', type_))
 
     async def get_from_crunchy(self, tag=None, type_="hentai"):
-        url = CRUNCHY_API_BASE + f"/nsfw/{type_}"
-        if tag is not None:
-            url += f"?tag={tag}"
-        async with self.session.get(url) as r:
-            result = await r.json()
-            return result
+        return await self._take(('crunchy', type_, tag))
 
 class NSFW(commands.Cog):
     def __init__(self, bot):
         self.bot = bot
-        self.collector = ApiCollectors()
         self.NSFW_HENTAI_TAGS = [
             # 'ass': os.listdir(f"{base}hentai/ass"),
             'big_boobs',
@@ -46,13 +101,16 @@ class NSFW(commands.Cog):
             'underwear',
             'yuri',
         ]
+        self.collector = ApiCollectors(bot, neko_types=['ass', 'pussy', 'gonewild'],
+                                       crunchy_tags=[None, *self.NSFW_HENTAI_TAGS])
+        self.bot.loop.create_task(self.collector.prefill())
 
     @commands.command()
     async def hentai(self, ctx, tag: str=None):
         if not ctx.channel.is_nsfw():
             return await ctx.send("<:cheeky:717784139226546297> Oops! NSFW commands can only be used in NSFW channels.")
 
-        if ctx.has_voted(ctx.author.id) >= 1:
+        if (await ctx.has_voted(ctx.author.id)) >= 1:
             if ctx.guild is not None:
                 if not ctx.guild_config.nsfw_enabled:
                     return await ctx.send("<:cheeky:717784139226546297> Oops! NSFW is disabled in this server,"
@@ -71,7 +129,7 @@ class NSFW(commands.Cog):
         if not ctx.channel.is_nsfw():
             return await ctx.send("<:cheeky:717784139226546297> Oops! NSFW commands can only be used in NSFW channels.")
 
-        if ctx.has_voted(ctx.author.id) >= 1:
+        if (await ctx.has_voted(ctx.author.id)) >= 1:
             if ctx.guild is not None:
                 if not ctx.guild_config.nsfw_enabled:
                     return await ctx.send("<:cheeky:717784139226546297> Oops! NSFW is disabled in this server,"
@@ -86,7 +144,7 @@ class NSFW(commands.Cog):
         if not ctx.channel.is_nsfw():
             return await ctx.send("<:cheeky:717784139226546297> Oops! NSFW commands can only be used in NSFW channels.")
 
-        if ctx.has_voted(ctx.author.id) >= 1:
+        if (await ctx.has_voted(ctx.author.id)) >= 1:
             if ctx.guild is not None:
                 if not ctx.guild_config.nsfw_enabled:
                     return await ctx.send("<:cheeky:717784139226546297> Oops! NSFW is disabled in this server,"
@@ -101,7 +159,7 @@ class NSFW(commands.Cog):
         if not ctx.channel.is_nsfw():
             return await ctx.send("<:cheeky:717784139226546297> Oops! NSFW commands can only be used in NSFW channels.")
 
-        if ctx.has_voted(ctx.author.id) >= 1:
+        if (await ctx.has_voted(ctx.author.id)) >= 1:
             if ctx.guild is not None:
                 if not ctx.guild_config.nsfw_enabled:
                     return await ctx.send("<:cheeky:717784139226546297> Oops! NSFW is disabled in this server,"
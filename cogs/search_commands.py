@@ -1,9 +1,12 @@
 import discord
-import aiohttp
 import random
+import time
 
+from datetime import timedelta
 from discord.ext import commands
 
+from data.cachemanager import Store, MISSING
+from logger import Logger
 
 BASE_URL = "https://crunchy-bot.live/api"
 RANDOM_THUMBS = [
@@ -12,11 +15,73 @@ RANDOM_THUMBS = [
     'https://cdn.discordapp.com/attachments/680350705038393344/717784215986634953/cheeky.png',
     'https://cdn.discordapp.com/attachments/680350705038393344/717784211771097179/thank_you.png'
 ]
+DETAILS_URLS = {
+    'anime': BASE_URL + "/anime/details?terms={}&legacy=True",
+    'manga': BASE_URL + "/manga/details?terms={}&legacy=True",
+    'webtoon': BASE_URL + "/webtoon/details?terms={}",
+}
+DETAILS_FRESH = timedelta(hours=6).total_seconds()  # After this a hit is still served but refreshed in the background
+DETAILS_STALE = timedelta(days=2)  # Unused entries are dropped after this
+SEARCH_FAILED = ("<:HimeSad:676087829557936149> Oh no! "
+                 "Something seems to have gone wrong when searching for that."
+                 " Please try again later!")
+NOT_FOUND = "<:HimeSad:676087829557936149> Oh no! I couldn't find what you are searching for."
+
+
+class DetailsUnavailable(Exception):
+    """ The details api answered with something other than a 200 """
 
 
 class Search(commands.Cog):
     def __init__(self, bot):
         self.bot = bot
+        self.bot.cache.add_cache_store(Store(name='details', max_time=DETAILS_STALE, max_entries=10_000,
+                                             policy='lfu', negative_time=timedelta(minutes=30)))
+        self._refreshing = {}  # (kind, query) -> background refresh task
+
+    def cog_unload(self):
+        # Cancelled first, a refresh finishing after this would store into a missing cache store,
+        # get_or_load calls still in flight skip storing once the store is removed
+        for task in self._refreshing.values():
+            task.cancel()
+        self.bot.cache.remove_cache_store('details')
+
+    @staticmethod
+    def normalize(args) -> str:
+        """ `Attack  on TITAN` and `attack on titan` are the same lookup """
+        return " ".join(" ".join(args).lower().split())
+
+    async def _load_details(self, kind: str, query: str):
+        async with self.bot.http_session.get(DETAILS_URLS[kind].format(query.replace(" ", "+"))) as resp:
+            if resp.status != 200:
+                raise DetailsUnavailable(f"{kind} details returned {resp.status}")
+            details = await resp.json()
+        return (time.monotonic(), details) if len(details) >= 1 else MISSING
+
+    async def _refresh_details(self, kind: str, query: str):
+        try:
+            fetched = await self._load_details(kind, query)
+            self.bot.cache.store('details', (kind, query), fetched)
+        except Exception as e:  # Keep serving the stale copy, the next hit tries again
+            Logger.log_info(f"Failed to refresh {kind} details for '{query}': {e}", error=True)
+        finally:
+            self._refreshing.pop((kind, query), None)
+
+    async def get_details(self, kind: str, args) -> list:
+        """
+            Search results for anime, manga or webtoon from the response cache, shared by all three
+            commands. Entries older than DETAILS_FRESH are returned as is and refreshed in the background,
+            searches with no results are negatively cached. Raises DetailsUnavailable if the api fails.
+        """
+        query = self.normalize(args)
+        key = (kind, query)
+        cached = await self.bot.cache.get_or_load('details', key, lambda: self._load_details(kind, query))
+        if cached is MISSING:
+            return []
+        fetched_at, details = cached
+        if time.monotonic() - fetched_at > DETAILS_FRESH and key not in self._refreshing:
+            self._refreshing[key] = self.bot.loop.create_task(self._refresh_details(kind, query))
+        return details
 
     @commands.command(name="animedetails", aliases=['ad', 'anime'])
     async def anime_details(self, ctx, *args):
@@ -24,21 +89,15 @@ class Search(commands.Cog):
             return await ctx.send("<:HimeMad:676087826827444227> Oh no! You cant expect me to read your mind! "
                                   "You need to give me something to search for!")
 
-        details_url = BASE_URL + "/anime/details?terms={}&legacy=True"
-        async with aiohttp.ClientSession() as sess:
-            async with sess.get(details_url.format("+".join(args))) as resp:
-                if resp.status != 200:
-                    return await ctx.send("<:HimeSad:676087829557936149> Oh no! "
-                                          "Something seems to have gone wrong when searching for that."
-                                          " Please try again later!")
-                else:
-                    details = await resp.json()
-                    if len(details) >= 1:
-                        title = details[0]['title']
-                        details = details[0]['data']
-                    else:
-                        return await ctx.send("<:HimeSad:676087829557936149> Oh no! "
-                                              "I couldn't find what you are searching for.")
+        try:
+            details = await self.get_details('anime', args)
+        except DetailsUnavailable:
+            return await ctx.send(SEARCH_FAILED)
+        if len(details) >= 1:
+            title = details[0]['title']
+            details = details[0]['data']
+        else:
+            return await ctx.send(NOT_FOUND)
         embed = discord.Embed(
             title=f"<:CrunchyRollLogo:676087821596885013>  {title}  <:CrunchyRollLogo:676087821596885013>",
             url=f"https://www.crunchyroll.com/{title.lower().replace(' ', '-')}",
@@ -60,21 +119,14 @@ class Search(commands.Cog):
             return await ctx.send("<:HimeMad:676087826827444227> Oh no! You cant expect me to read your mind! "
                                   "You need to give me something to search for!")
 
-        details_url = BASE_URL + "/manga/details?terms={}&legacy=True"
-        url = details_url.format("+".join(args))
-        async with aiohttp.ClientSession() as sess:
-            async with sess.get(url) as resp:
-                if resp.status != 200:
-                    return await ctx.send("<:HimeSad:676087829557936149> Oh no! "
-                                          "Something seems to have gone wrong when searching for that."
-                                          " Please try again later!")
-                else:
-                    details = await resp.json()
-                    if len(details) >= 1:
-                        details = details[0]
-                    else:
-                        return await ctx.send("<:HimeSad:676087829557936149> Oh no! "
-                                              "I couldn't find what you are searching for.")
+        try:
+            details = await self.get_details('manga', args)
+        except DetailsUnavailable:
+            return await ctx.send(SEARCH_FAILED)
+        if len(details) >= 1:
+            details = details[0]
+        else:
+            return await ctx.send(NOT_FOUND)
         embed = discord.Embed(
             title=f"{details['title']}",
             url=details.get('url'),
@@ -99,21 +151,14 @@ class Search(commands.Cog):
             return await ctx.send("<:HimeMad:676087826827444227> Oh no! You cant expect me to read your mind! "
                                   "You need to give me something to search for!")
 
-        details_url = BASE_URL + "/webtoon/details?terms={}"
-        url = details_url.format("+".join(args))
-        async with aiohttp.ClientSession() as sess:
-            async with sess.get(url) as resp:
-                if resp.status != 200:
-                    return await ctx.send("<:HimeSad:676087829557936149> Oh no! "
-                                          "Something seems to have gone wrong when searching for that."
-                                          " Please try again later!")
-                else:
-                    details = await resp.json()
-                    if len(details) >= 1:
-                        details = details[0]
-                    else:
-                        return await ctx.send("<:HimeSad:676087829557936149> Oh no! "
-                                              "I couldn't find what you are searching for.")
+        try:
+            details = await self.get_details('webtoon', args)
+        except DetailsUnavailable:
+            return await ctx.send(SEARCH_FAILED)
+        if len(details) >= 1:
+            details = details[0]
+        else:
+            return await ctx.send(NOT_FOUND)
 
         embed = discord.Embed(
             title=f"<:webtoon:742857781232795741>  {details['title']}  <:webtoon:742857781232795741>",
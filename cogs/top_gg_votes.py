@@ -28,15 +28,18 @@ class TopGG(commands.Cog):
     @tasks.loop(minutes=10)
     async def clear_votes(self):
         timestamp = time.time()
-        removed = self.bot.database.remove_outdated(time_secs=timestamp)
+        removed = await self.bot.async_database.remove_outdated(time_secs=timestamp)
         Logger.log_dbl("Removed: {} outdated votes".format(removed))
 
     @tasks.loop(minutes=30.0)
     async def update_stats(self):
         """This function runs every 30 minutes to automatically update your server count"""
         try:
-            await self.dblpy.post_guild_count()
-            Logger.log_dbl('Posted server count ({})'.format(self.dblpy.guild_count()))
+            # Posted through the http client so the count covers every cluster, not just this process
+            await self.bot.wait_until_ready()
+            guild_count = self.bot.total_guild_count()
+            await self.dblpy.http.post_guild_count(self.bot.user.id, guild_count, None, None)
+            Logger.log_dbl('Posted server count ({})'.format(guild_count))
         except Exception as e:
             import traceback
             traceback.print_exc()
@@ -49,12 +52,12 @@ class TopGG(commands.Cog):
         data['user'] = int(data['user'])
         now = time.time()
         expires = now + timedelta(hours=24).total_seconds()
-        check = self.bot.database.get_vote(user_id=data['user'])
+        check = await self.bot.async_database.get_vote(user_id=data['user'])
         if check['expires_in'] is None:
-            self.bot.database.add_vote(data['user'], expires)
+            await self.bot.async_database.add_vote(data['user'], expires)
             self.bot.cache.store('votes', data['user'], {'user_id': data['user'], 'expires_in': expires})
         else:
-            self.bot.database.update_vote(data['user'], expires)
+            await self.bot.async_database.update_vote(data['user'], expires)
             self.bot.cache.store('votes', data['user'], {'user_id': data['user'], 'expires_in': expires})
 
     @commands.Cog.listener()
@@ -62,12 +65,12 @@ class TopGG(commands.Cog):
         data['user'] = int(data['user'])
         now = time.time()
         expires = now + timedelta(hours=24).total_seconds()
-        check = self.bot.database.get_vote(user_id=data['user'])
+        check = await self.bot.async_database.get_vote(user_id=data['user'])
         if check['expires_in'] is None:
-            self.bot.database.add_vote(data['user'], expires)
+            await self.bot.async_database.add_vote(data['user'], expires)
             self.bot.cache.store('votes', data['user'], {'user_id': data['user'], 'expires_in': expires})
         else:
-            self.bot.database.update_vote(data['user'], expires)
+            await self.bot.async_database.update_vote(data['user'], expires)
             self.bot.cache.store('votes', data['user'], {'user_id': data['user'], 'expires_in': expires})
 
 
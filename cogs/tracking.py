@@ -35,19 +35,21 @@ RANDOM_EMOJIS = [
 
 
 async def add_watchlist(ctx, bot, name, url):
-    user_tracker: UserWatchlist = UserWatchlist(user_id=ctx.author.id, database=bot.database)
-    if (user_tracker.amount_of_items >= FALSE_PREMIUM_MAX_IN_STORE) and (ctx.has_voted(ctx.author.id) == 0):
+    user_tracker: UserWatchlist = await bot.async_database.run(UserWatchlist, user_id=ctx.author.id,
+                                                               database=bot.database)
+    has_voted = await ctx.has_voted(ctx.author.id)
+    if (user_tracker.amount_of_items >= FALSE_PREMIUM_MAX_IN_STORE) and (has_voted == 0):
         return {'content': "<:HimeMad:676087826827444227> Oh no! "
                            "You dont have enough space in your watchlist "
                            "to add this, get more storage by voting here "
                            "https://top.gg/bot/656598065532239892/vote"
                 }
-    elif (user_tracker.amount_of_items >= TRUE_PREMIUM_MAX_IN_STORE[0]) and (ctx.has_voted(ctx.author.id) == 1):
+    elif (user_tracker.amount_of_items >= TRUE_PREMIUM_MAX_IN_STORE[0]) and (has_voted == 1):
         return {'content': f"<:HimeMad:676087826827444227> Oh no! "
                            f"You seem to have maxed out your watchlist, you can get more by"
                            f" buying premium here to help support my development: {PREMIUM_URL}"
                 }
-    elif (user_tracker.amount_of_items >= TRUE_PREMIUM_MAX_IN_STORE[1]) and (ctx.has_voted(ctx.author.id) > 1):
+    elif (user_tracker.amount_of_items >= TRUE_PREMIUM_MAX_IN_STORE[1]) and (has_voted > 1):
         return {'content': f"<:HimeMad:676087826827444227> Oh wow! "
                            f"You've managed to add over {TRUE_PREMIUM_MAX_IN_STORE[1]} things to your watchlist area! "
                            f"However, you'll need to either delete some to add more or contact my developer"
@@ -55,7 +57,7 @@ async def add_watchlist(ctx, bot, name, url):
                 }
     else:
         try:
-            user_tracker.add_content({'name': name, 'url': url})
+            await bot.async_database.run(user_tracker.add_content, {'name': name, 'url': url})
             return {
                 'content': f"<:HimeHappy:677852789074034691> Success!"
                            f" I've added {name} to your watchlist!"
@@ -65,19 +67,21 @@ async def add_watchlist(ctx, bot, name, url):
 
 
 async def add_favourites(ctx, bot, name, url):
-    user_tracker: UserFavourites = UserFavourites(user_id=ctx.author.id, database=bot.database)
-    if (user_tracker.amount_of_items >= FALSE_PREMIUM_MAX_IN_STORE) and (ctx.has_voted(ctx.author.id) == 0):
+    user_tracker: UserFavourites = await bot.async_database.run(UserFavourites, user_id=ctx.author.id,
+                                                                database=bot.database)
+    has_voted = await ctx.has_voted(ctx.author.id)
+    if (user_tracker.amount_of_items >= FALSE_PREMIUM_MAX_IN_STORE) and (has_voted == 0):
         return {'content': "<:HimeMad:676087826827444227> Oh no! "
                            "You dont have enough space in your favourites "
                            "to add this, get more storage by voting here "
                            "https://top.gg/bot/656598065532239892/vote"
                 }
-    elif (user_tracker.amount_of_items >= TRUE_PREMIUM_MAX_IN_STORE[0]) and (ctx.has_voted(ctx.author.id) == 1):
+    elif (user_tracker.amount_of_items >= TRUE_PREMIUM_MAX_IN_STORE[0]) and (has_voted == 1):
         return {'content': f"<:HimeMad:676087826827444227> Oh no! "
                            f"You seem to have maxed out your favourites, you can get more by"
                            f" buying premium here to help support my development: {PREMIUM_URL}"
                 }
-    elif (user_tracker.amount_of_items >= TRUE_PREMIUM_MAX_IN_STORE[1]) and (ctx.has_voted(ctx.author.id) > 1):
+    elif (user_tracker.amount_of_items >= TRUE_PREMIUM_MAX_IN_STORE[1]) and (has_voted > 1):
         return {'content': f"<:HimeMad:676087826827444227> Oh wow! "
                            f"You've managed to add over {TRUE_PREMIUM_MAX_IN_STORE[1]} things to your favourites area! "
                            f"However, you'll need to either delete some to add more or contact my developer"
@@ -85,7 +89,7 @@ async def add_favourites(ctx, bot, name, url):
                 }
     else:
         try:
-            user_tracker.add_content({'name': name, 'url': url})
+            await bot.async_database.run(user_tracker.add_content, {'name': name, 'url': url})
             return {
                 'content': f"<:HimeHappy:677852789074034691> Success!"
                            f" I've added {name} to your favourites!"
@@ -182,7 +186,7 @@ class AddingAnime(commands.Cog):
             return await ctx.send(f"<:HimeMad:676087826827444227> Oops! "
                                   f"You didnt mention the person you wanted to recommend an Anime to.")
 
-        user_area = UserRecommended(user_id=user.id, database=self.bot.database)
+        user_area = await self.bot.async_database.run(UserRecommended, user_id=user.id, database=self.bot.database)
         if not user_area.is_public:
             return await ctx.send(f"<:HimeMad:676087826827444227> Oops! "
                                   f"The user you mentioned has their recommended list set to private.")
@@ -210,7 +214,7 @@ class AddingAnime(commands.Cog):
         if name.endswith(" "):
             name = name[:len(name) - 1]
         try:
-            user_area.add_content({'name': name, 'url': url})
+            await self.bot.async_database.run(user_area.add_content, {'name': name, 'url': url})
             return await ctx.send(f"<:HimeHappy:677852789074034691> Success!"
                                   f""" I've added "{name}" to {user.name}'s recommended list.""")
         except Exception as e:
@@ -251,18 +255,21 @@ class UserSettings(commands.Cog):
     async def firewall(self, ctx, command_: str):
         """ Toggle public/private system """
         if command_ == "recommended":
-            user_area = UserRecommended(user_id=ctx.author.id, database=self.bot.database)
-            mode = user_area.toggle_public()
+            user_area = await self.bot.async_database.run(UserRecommended, user_id=ctx.author.id,
+                                                          database=self.bot.database)
+            mode = await self.bot.async_database.run(user_area.toggle_public)
             return await ctx.send(f"<:HimeHappy:677852789074034691> Your recommended"
                                   f" list is now {'**public**' if mode else '**private**'}")
         elif command_ == "watchlist":
-            user_area = UserWatchlist(user_id=ctx.author.id, database=self.bot.database)
-            mode = user_area.toggle_public()
+            user_area = await self.bot.async_database.run(UserWatchlist, user_id=ctx.author.id,
+                                                          database=self.bot.database)
+            mode = await self.bot.async_database.run(user_area.toggle_public)
             return await ctx.send(f"<:HimeHappy:677852789074034691> Your watchlist"
                                   f" list is now {'**public**' if mode else '**private**'}")
         elif command_ == "favourites":
-            user_area = UserFavourites(user_id=ctx.author.id, database=self.bot.database)
-            mode = user_area.toggle_public()
+            user_area = await self.bot.async_database.run(UserFavourites, user_id=ctx.author.id,
+                                                          database=self.bot.database)
+            mode = await self.bot.async_database.run(user_area.toggle_public)
             return await ctx.send(f"<:HimeHappy:677852789074034691> Your favourites"
                                   f" list is now {'**public**' if mode else '**private**'}")
         else:
@@ -401,7 +408,8 @@ class ViewTracked(commands.Cog):
                 member = None
 
         if cycle:
-            user_area = UserWatchlist(user_id=ctx.author.id, database=self.bot.database)
+            user_area = await self.bot.async_database.run(UserWatchlist, user_id=ctx.author.id,
+                                                          database=self.bot.database)
             if user_area.amount_of_items <= 0:
                 embed = discord.Embed(color=self.bot.colour)
                 embed.description = f"Oops! {'You' if member is None else 'They'} dont " \
@@ -419,12 +427,13 @@ class ViewTracked(commands.Cog):
 
         if member is not None:
             user_ = member
-            user_area = UserWatchlist(user_id=member.id, database=self.bot.database)
+            user_area = await self.bot.async_database.run(UserWatchlist, user_id=member.id, database=self.bot.database)
             if not user_area.is_public:
                 return await ctx.send("Oops! This user has their watchlist firewalled (Private).")
         else:
             user_ = ctx.author
-            user_area = UserWatchlist(user_id=ctx.author.id, database=self.bot.database)
+            user_area = await self.bot.async_database.run(UserWatchlist, user_id=ctx.author.id,
+                                                          database=self.bot.database)
 
         if user_area.amount_of_items <= 0:
             embed = discord.Embed(color=self.bot.colour) \
@@ -466,7 +475,8 @@ class ViewTracked(commands.Cog):
                 member = None
 
         if cycle:
-            user_area = UserFavourites(user_id=ctx.author.id, database=self.bot.database)
+            user_area = await self.bot.async_database.run(UserFavourites, user_id=ctx.author.id,
+                                                          database=self.bot.database)
             if user_area.amount_of_items <= 0:
                 embed = discord.Embed(color=self.bot.colour) \
                     .set_footer(text="Hint: Vote for Crunchy on top.gg to get more perks!")
@@ -483,12 +493,13 @@ class ViewTracked(commands.Cog):
 
         if member is not None:
             user_ = member
-            user_area = UserFavourites(user_id=member.id, database=self.bot.database)
+            user_area = await self.bot.async_database.run(UserFavourites, user_id=member.id, database=self.bot.database)
             if not user_area.is_public:
                 return await ctx.send("Oops! This user has their recommended firewalled (Private).")
         else:
             user_ = ctx.author
-            user_area = UserFavourites(user_id=ctx.author.id, database=self.bot.database)
+            user_area = await self.bot.async_database.run(UserFavourites, user_id=ctx.author.id,
+                                                          database=self.bot.database)
         if user_area.amount_of_items <= 0:
             embed = discord.Embed(color=self.bot.colour) \
                 .set_footer(text="Hint: Vote for Crunchy on top.gg to get more perks!")
@@ -529,7 +540,8 @@ class ViewTracked(commands.Cog):
                 member = None
 
         if cycle:
-            user_area = UserRecommended(user_id=ctx.author.id, database=self.bot.database)
+            user_area = await self.bot.async_database.run(UserRecommended, user_id=ctx.author.id,
+                                                          database=self.bot.database)
             if user_area.amount_of_items <= 0:
                 embed = discord.Embed(color=self.bot.colour) \
                     .set_footer(text="Hint: Vote for Crunchy on top.gg to get more perks!")
@@ -546,12 +558,14 @@ class ViewTracked(commands.Cog):
 
         if member is not None:
             user_ = member
-            user_area = UserRecommended(user_id=member.id, database=self.bot.database)
+            user_area = await self.bot.async_database.run(UserRecommended, user_id=member.id,
+                                                          database=self.bot.database)
             if not user_area.is_public:
                 return await ctx.send("Oops! This user has their recommended firewalled (Private).")
         else:
             user_ = ctx.author
-            user_area = UserRecommended(user_id=ctx.author.id, database=self.bot.database)
+            user_area = await self.bot.async_database.run(UserRecommended, user_id=ctx.author.id,
+                                                          database=self.bot.database)
         if user_area.amount_of_items <= 0:
             embed = discord.Embed(color=self.bot.colour) \
                 .set_footer(text="Hint: Vote for Crunchy on top.gg to get more perks!")
@@ -576,10 +590,14 @@ class RemoveTracked(commands.Cog):
     def __init__(self, bot):
         self.bot = bot
 
+    def cog_unload(self):
+        """ Buffered list edits must not be lost on reload, flushed in the executor as it blocks """
+        self.bot.loop.create_task(self.bot.async_database.run(self.bot.database.write_buffer.flush))
+
     @commands.command(name="removewatchlist", aliases=['rw'])
     async def remove_watchlist(self, ctx: commands.Context, index=None):
         """ Remove something from watch list """
-        user_area = UserWatchlist(user_id=ctx.author.id, database=self.bot.database)
+        user_area = await self.bot.async_database.run(UserWatchlist, user_id=ctx.author.id, database=self.bot.database)
         if index is None:
             await ctx.send("Oops! You haven't given me a number that matches to your list, check your list here:")
             command: commands.Command = self.bot.get_command("my_watchlist")
@@ -596,13 +614,13 @@ class RemoveTracked(commands.Cog):
         if index < 0:
             return await ctx.send("<:cheeky:717784139226546297> You cant remove a negative number silly!")
         if index - 1 in range(0, user_area.amount_of_items):
-            deleted = user_area.remove_content(index - 1)
+            deleted = await self.bot.async_database.run(user_area.remove_content, index - 1)
             return await ctx.send(f"{random.choice(RANDOM_EMOJIS)} All done! Ive removed {deleted['name']}")
 
     @commands.command(name="removefavourite", aliases=['rf'])
     async def remove_favourites(self, ctx: commands.Context, index=None):
         """ Remove something from favourites list """
-        user_area = UserFavourites(user_id=ctx.author.id, database=self.bot.database)
+        user_area = await self.bot.async_database.run(UserFavourites, user_id=ctx.author.id, database=self.bot.database)
         if index is None:
             await ctx.send("Oops! You haven't given me a number that matches to your list, check your list here:")
             command: commands.Command = self.bot.get_command("my_favourites")
@@ -620,14 +638,15 @@ class RemoveTracked(commands.Cog):
         if index < 0:
             return await ctx.send("<:cheeky:717784139226546297> You cant remove a negative number silly!")
         if index - 1 in range(0, user_area.amount_of_items):
-            deleted = user_area.remove_content(index - 1)
+            deleted = await self.bot.async_database.run(user_area.remove_content, index - 1)
             return await ctx.send(f"{random.choice(RANDOM_EMOJIS)} All done! Ive removed {deleted['name']}")
 
     @commands.command(name="removerecommended", aliases=['rr'])
     async def remove_recommended(self, ctx, index=None):
         """ Remove something from recommended list """
 
-        user_area = UserRecommended(user_id=ctx.author.id, database=self.bot.database)
+        user_area = await self.bot.async_database.run(UserRecommended, user_id=ctx.author.id,
+                                                      database=self.bot.database)
         if index is None:
             await ctx.send("Oops! You haven't given me a number that matches to your list, check your list here:")
             command: commands.Command = self.bot.get_command("my_recommended")
@@ -645,7 +664,7 @@ class RemoveTracked(commands.Cog):
         if index < 0:
             return await ctx.send("<:cheeky:717784139226546297> You cant remove a negative number silly!")
         if index - 1 in range(0, user_area.amount_of_items):
-            deleted = user_area.remove_content(index - 1)
+            deleted = await self.bot.async_database.run(user_area.remove_content, index - 1)
             return await ctx.send(f"{random.choice(RANDOM_EMOJIS)} All done! Ive removed {deleted['name']}")
 
 
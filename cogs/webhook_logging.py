@@ -1,5 +1,4 @@
 import json
-import aiohttp
 import asyncio
 
 from discord.ext import commands
@@ -23,7 +22,7 @@ class WebhookLogging(commands.Cog):
         asyncio.get_event_loop().create_task(self.boot())
 
     async def boot(self):
-        self.session = aiohttp.ClientSession()
+        self.session = self.bot.http_session
         self.guild_webhook = Webhook.from_url(self.GUILD_URL, adapter=AsyncWebhookAdapter(self.session))
         self.vote_webhook = Webhook.from_url(self.VOTE_URL, adapter=AsyncWebhookAdapter(self.session))
         self.command_webhook = Webhook.from_url(self.COMMAND_URL, adapter=AsyncWebhookAdapter(self.session))
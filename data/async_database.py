@@ -0,0 +1,43 @@
+import asyncio
+import functools
+import inspect
+
+
+class AsyncDatabase:
+    """
+        Executor backed facade over one of the blocking Mongo database classes,
+        every method of the wrapped database is exposed as a coroutine with the
+        same name and arguments so pymongo round trips never run on the event loop.
+        + Usage:
+            - await bot.async_database.get_vote(user_id)
+            - await bot.async_database.run(GuildWebhooks, guild_id, bot.database)
+    """
+
+    def __init__(self, database, executor=None):
+        """
+        :param database: The sync MongoDatabase instance to wrap.
+        :param executor: -> Optional
+        If executor is None it falls back to the loop's default executor.
+        """
+        self.database = database
+        self.executor = executor
+        self._wrapped = {}
+
+    async def run(self, func, *args, **kwargs):
+        """ Runs any blocking callable (db methods, objects that load on init) in the executor """
+        loop = asyncio.get_event_loop()
+        return await loop.run_in_executor(self.executor, functools.partial(func, *args, **kwargs))
+
+    def __getattr__(self, name):
+        attr = getattr(self.database, name)
+        if not inspect.ismethod(attr):
+            return attr
+
+        wrapped = self._wrapped.get(name)
+        if wrapped is None:
+            @functools.wraps(attr)
+            async def wrapped(*args, **kwargs):
+                return await self.run(attr, *args, **kwargs)
+
+            self._wrapped[name] = wrapped
+        return wrapped
@@ -1,39 +1,246 @@
-from datetime import datetime, timedelta
+from collections import OrderedDict
+from datetime import timedelta
 import asyncio
+import heapq
+import itertools
+import sys
+import time
 from logger import Logger
 
+
+def approximate_size(obj, depth: int = 3) -> int:
+    """ Rough deep size of an object in bytes, only follows containers and __dict__ `depth` levels down """
+    size = sys.getsizeof(obj)
+    if depth <= 0:
+        return size
+    if isinstance(obj, dict):
+        size += sum(approximate_size(k, depth - 1) + approximate_size(v, depth - 1) for k, v in obj.items())
+    elif isinstance(obj, (list, tuple, set, frozenset)):
+        size += sum(approximate_size(item, depth - 1) for item in obj)
+    elif hasattr(obj, '__dict__'):
+        size += approximate_size(vars(obj), depth - 1)
+    return size
+
+
+class LRUPolicy:
+    """ Evicts the entry that was used the longest time ago """
+
+    def __init__(self):
+        self._order = OrderedDict()
+
+    def add(self, key):
+        self._order[key] = None
+
+    def touch(self, key):
+        self._order.move_to_end(key)
+
+    def remove(self, key):
+        del self._order[key]
+
+    def victim(self):
+        return next(iter(self._order))
+
+
+class LFUPolicy:
+    """ Evicts the least frequently used entry, ties go to the one used the longest time ago """
+
+    def __init__(self):
+        self._counts = {}
+        self._buckets = {}  # use count -> keys with that count in LRU order
+        self._min = 0
+
+    def _unlink(self, key, count):
+        bucket = self._buckets[count]
+        del bucket[key]
+        if not bucket:
+            del self._buckets[count]
+
+    def add(self, key):
+        self._counts[key] = 1
+        self._buckets.setdefault(1, OrderedDict())[key] = None
+        self._min = 1
+
+    def touch(self, key):
+        count = self._counts[key]
+        self._unlink(key, count)
+        if self._min == count and count not in self._buckets:
+            self._min = count + 1
+        self._counts[key] = count + 1
+        self._buckets.setdefault(count + 1, OrderedDict())[key] = None
+
+    def remove(self, key):
+        self._unlink(key, self._counts.pop(key))
+
+    def victim(self):
+        if self._min not in self._buckets:
+            self._min = min(self._buckets)
+        return next(iter(self._buckets[self._min]))
+
+
+POLICIES = {
+    'lru': LRUPolicy,
+    'lfu': LFUPolicy,
+}
+
+
+class _Missing:
+    """ Sentinel cached for ids the database has no document for """
+
+    def __repr__(self):
+        return "<MISSING>"
+
+    def __bool__(self):
+        return False
+
+
+MISSING = _Missing()
+
+
+class Entry:
+    __slots__ = ('data', 'expires', 'seq', 'size')
+
+    def __init__(self, data, expires: float, seq: int, size: int = 0):
+        self.data = data
+        self.expires = expires  # monotonic time this entry dies at, pushed back on every hit
+        self.seq = seq  # sequence number of this entry's live item in the expiry heap
+        self.size = size  # approximate bytes, only measured when the store has a memory cap
+
+
 class Store:
-    def __init__(self, name: str, max_time: timedelta=timedelta(minutes=15)):
+    """
+        Sliding TTL cache, entries live for `max_time` after they were last stored or read.
+        Expiry is tracked with a heap of (deadline, seq, _id) so `clean` only ever touches
+        entries whose deadline has passed, hits just move the entry's own deadline forward
+        and the heap item is re-queued lazily when it comes up.
+        Optionally bounded by `max_entries` and / or an approximate `max_bytes`, once
+        over either cap entries are evicted following the `policy` ('lru' or 'lfu').
+        Ids known to have no document can be cached as `MISSING` for `negative_time`,
+        these do not slide and are replaced by the next real `store` of that id.
+    """
+
+    def __init__(self, name: str, max_time: timedelta=timedelta(minutes=15),
+                 max_entries: int=None, max_bytes: int=None, policy: str='lru',
+                 negative_time: timedelta=None):
         self.name = name
-        self._cache = {}
-        self._temp = {}
         self.max_time = max_time
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.policy = policy
+        self.negative_time = negative_time
+        self._ttl = max_time.total_seconds()
+        self._negative_ttl = negative_time.total_seconds() if negative_time is not None else self._ttl
+        self._cache = {}
+        self._expiry = []
+        self._counter = itertools.count()
+        self._policy = POLICIES[policy]()
+        self._bytes = 0
+
+        self.hits = 0
+        self.negative_hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def _queue(self, _id, entry: Entry):
+        entry.seq = next(self._counter)
+        heapq.heappush(self._expiry, (entry.expires, entry.seq, _id))
+
+    def _drop(self, _id) -> Entry:
+        entry = self._cache.pop(_id)
+        self._policy.remove(_id)
+        self._bytes -= entry.size
+        return entry
+
+    def _evict(self):
+        while self._cache and ((self.max_entries is not None and len(self._cache) > self.max_entries) or
+                               (self.max_bytes is not None and self._bytes > self.max_bytes)):
+            self._drop(self._policy.victim())
+            self.evictions += 1
 
     def get(self, _id):
-        resp = self._cache.get(_id, None)
-        if resp is not None:
-            data = resp['data']
-            self.store(_id=_id, _object=data)
-            return data
-        else:
-            return resp
+        entry = self._cache.get(_id)
+        if entry is None:
+            self.misses += 1
+            return None
+
+        now = time.monotonic()
+        if entry.expires <= now:
+            self._drop(_id)
+            self.misses += 1
+            return None
+        self._policy.touch(_id)
+        if entry.data is MISSING:
+            self.negative_hits += 1
+            return MISSING
+        entry.expires = now + self._ttl
+        self.hits += 1
+        return entry.data
 
     def store(self, _id, _object):
-        self._cache[_id] = {'entered': datetime.now(), 'data': _object}
+        ttl = self._negative_ttl if _object is MISSING else self._ttl
+        expires = time.monotonic() + ttl
+        size = approximate_size(_object) if self.max_bytes is not None else 0
+        entry = self._cache.get(_id)
+        if entry is None:
+            entry = self._cache[_id] = Entry(_object, expires, -1, size)
+            self._policy.add(_id)
+            self._queue(_id, entry)
+        else:
+            self._bytes -= entry.size
+            entry.data = _object
+            entry.expires = expires
+            entry.size = size
+            self._policy.touch(_id)
+        self._bytes += size
+        self._evict()
+
+    def store_missing(self, _id):
+        self.store(_id, MISSING)
+
+    def __contains__(self, _id):
+        """ Whether a live entry exists, without counting as a lookup or sliding its TTL """
+        entry = self._cache.get(_id)
+        return entry is not None and entry.expires > time.monotonic()
+
+    def remove(self, _id):
+        if _id not in self._cache:
+            return None
+        return self._drop(_id).data
 
     def clear(self):
         self._cache = {}
+        self._expiry = []
+        self._policy = POLICIES[self.policy]()
+        self._bytes = 0
 
-    def check(self, item):
-        if (datetime.now() - item[1]['entered']) > self.max_time:
-            return False
-        else:
-            return item
+    def stats(self) -> dict:
+        lookups = self.hits + self.negative_hits + self.misses
+        return {
+            'entries': len(self._cache),
+            'approximate_bytes': self._bytes if self.max_bytes is not None else None,
+            'hits': self.hits,
+            'negative_hits': self.negative_hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+            'hit_rate': (self.hits + self.negative_hits) / lookups if lookups else 0.0,
+        }
+
+    def clean(self) -> int:
+        """ Drops expired entries, returns the amount removed """
+        now, removed = time.monotonic(), 0
+        while self._expiry and self._expiry[0][0] <= now:
+            _, seq, _id = heapq.heappop(self._expiry)
+            entry = self._cache.get(_id)
+            if entry is None or entry.seq != seq:  # Removed or replaced since this was queued
+                continue
+            if entry.expires <= now:
+                self._drop(_id)
+                removed += 1
+            else:
+                self._queue(_id, entry)
+        return removed
 
-    def clean(self):
-        all_entries = self._cache.items()
-        new = list(filter(self.check, all_entries))
-        self._cache = dict(new)
+    def __len__(self):
+        return len(self._cache)
 
     def __str__(self):
         return self.name
@@ -42,16 +249,31 @@ class Store:
 class CacheManager:
     def __init__(self):
         self.collections = {}
+        self._loading = {}  # (collection_name, _id) -> task of the load in flight
+        # Bumped by invalidations while a load is in flight, a load that sees a new generation
+        # read the document before the change and its result isn't cached
+        self._generations = {}  # (collection_name, _id) -> generation, only for keys being loaded
+        self._epochs = {}  # collection_name -> generation of the whole store, bumped on clear / reset / remove
 
     def add_cache_store(self, cache_collection: Store):
         self.collections[str(cache_collection)] = cache_collection
 
     def reset_cache_store(self, collection_name: str):
         collection: Store = self.collections[collection_name]
-        replacement = Store(name=collection.name, max_time=collection.max_time)
+        replacement = Store(name=collection.name, max_time=collection.max_time,
+                            max_entries=collection.max_entries, max_bytes=collection.max_bytes,
+                            policy=collection.policy, negative_time=collection.negative_time)
         self.collections[collection_name] = replacement
+        self._epochs[collection_name] = self._epochs.get(collection_name, 0) + 1
+
+    def clear(self, collection_name: str):
+        """ Drops every entry of a store, loads already in flight won't cache their result either """
+        self.collections[collection_name].clear()
+        self._epochs[collection_name] = self._epochs.get(collection_name, 0) + 1
 
     def remove_cache_store(self, collection_name: str) -> [Store, None]:
+        # Loads still in flight see the new epoch and skip storing into the removed store
+        self._epochs[collection_name] = self._epochs.get(collection_name, 0) + 1
         return self.collections.pop(collection_name, None)
 
     def get(self, collection_name: str, _id):
@@ -60,9 +282,65 @@ class CacheManager:
     def store(self, collection_name: str, _id, data):
         self.collections[collection_name].store(_id=_id, _object=data)
 
+    def store_missing(self, collection_name: str, _id):
+        """ Remember that the database has nothing for this id, `get` will return MISSING """
+        self.collections[collection_name].store_missing(_id=_id)
+
+    def store_if_absent(self, collection_name: str, _id, data) -> bool:
+        """ For warming the cache, never replaces a cached entry or races a load in flight """
+        if _id in self.collections[collection_name] or (collection_name, _id) in self._loading:
+            return False
+        self.collections[collection_name].store(_id=_id, _object=data)
+        return True
+
+    def invalidate(self, collection_name: str, _id):
+        key = (collection_name, _id)
+        if key in self._loading:
+            self._generations[key] = self._generations.get(key, 0) + 1
+        return self.collections[collection_name].remove(_id=_id)
+
+    def _generation(self, key) -> tuple:
+        return self._epochs.get(key[0], 0), self._generations.get(key, 0)
+
+    async def get_or_load(self, collection_name: str, _id, loader):
+        """
+            Returns the cached data or awaits `loader()` and caches what it returns,
+            concurrent misses for the same key all wait on the one load in flight.
+            Loaders return MISSING to have the id negatively cached.
+        """
+        data = self.get(collection_name, _id)
+        if data is not None:
+            return data
+
+        key = (collection_name, _id)
+        task = self._loading.get(key)
+        if task is None:
+            task = self._loading[key] = asyncio.ensure_future(self._load(key, loader))
+        # Shielded so one waiter being cancelled doesn't cancel the load for everyone else
+        return await asyncio.shield(task)
+
+    async def _load(self, key, loader):
+        collection_name, _id = key
+        generation = self._generation(key)
+        try:
+            data = await loader()
+            if self._generation(key) != generation:
+                return data  # Invalidated while loading, good for the waiters but possibly stale
+            if data is MISSING:
+                self.store_missing(collection_name, _id)
+            elif data is not None:
+                self.store(collection_name, _id, data)
+            return data
+        finally:
+            del self._loading[key]
+            self._generations.pop(key, None)
+
+    def stats(self) -> dict:
+        return {name: collection.stats() for name, collection in self.collections.items()}
+
     async def background_task(self):
         while True:
             for key in self.collections:
-                self.collections[key].clean()
-                Logger.log_cache("[ BACKGROUND TASK ] | Cleaned up cache {}!".format(key))
+                removed = self.collections[key].clean()
+                Logger.log_cache("[ BACKGROUND TASK ] | Cleaned up cache {}, removed {}!".format(key, removed))
             await asyncio.sleep(10)
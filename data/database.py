@@ -1,6 +1,8 @@
 import pymongo
 import json
 from logger import Logger, Timer
+from data.helpers import upsert, stamped
+from data.write_buffer import WriteBuffer
 
 
 class Settings:
@@ -15,18 +17,10 @@ class GuildData:
         self.db = db
         self.guild_configs = self.db["guilds"]
 
-    def set_guild_config(self, guild_id: int, config: dict) -> [dict, int]:
-        current_data = self.guild_configs.find_one({'_id': guild_id})
-        Logger.log_database("SET-GUILD: Guild with Id: {} returned with results: {}".format(guild_id, current_data))
-        if current_data is not None:
-            QUERY = {'_id': guild_id}
-            new_data = {'config': config}
-            resp = self.guild_configs.update_one(QUERY, {'$set': new_data})
-            return resp.raw_result
-        else:
-            data = {'_id': guild_id, 'config': config}
-            resp = self.guild_configs.insert_one(data)
-            return resp.inserted_id
+    def set_guild_config(self, guild_id: int, config: dict) -> dict:
+        resp = upsert(self.guild_configs, guild_id, {'config': config})
+        Logger.log_database("SET-GUILD: Guild with Id: {} returned with results: {}".format(guild_id, resp))
+        return resp
 
     def reset_guild_config(self, guild_id: int):
         current_data = self.guild_configs.find_one_and_delete({'_id': guild_id})
@@ -34,10 +28,22 @@ class GuildData:
             "DELETE-GUILD: Guild with Id: {} returned with results: {}".format(guild_id, current_data))
         return "COMPLETE"
 
-    def get_guild_config(self, guild_id: int) -> dict:
+    def find_guild_config(self, guild_id: int) -> [dict, None]:
+        """ Like get_guild_config but returns None when the guild has no custom settings """
         current_data = self.guild_configs.find_one({'_id': guild_id})
         Logger.log_database("GET-GUILD: User Content with Id: {} returned.".format(guild_id))
-        return current_data['config'] if current_data is not None else Settings.settings
+        return current_data['config'] if current_data is not None else None
+
+    def get_guild_config(self, guild_id: int) -> dict:
+        config = self.find_guild_config(guild_id)
+        return config if config is not None else dict(Settings.settings)
+
+    def find_guild_configs(self, guild_ids: list) -> dict:
+        """ Custom settings of every guild in guild_ids that has some, fetched with one $in query """
+        cursor = self.guild_configs.find({'_id': {'$in': guild_ids}}, {'config': 1})
+        configs = {doc['_id']: doc['config'] for doc in cursor}
+        Logger.log_database("GET-GUILDS: {} of {} guilds returned.".format(len(configs), len(guild_ids)))
+        return configs
 
 
 class GuildWebhooks:
@@ -48,18 +54,10 @@ class GuildWebhooks:
         self.guild_web_hooks = self.db["webhooks"]
 
     @Timer.timeit
-    def set_guild_webhooks(self, guild_id: int, config: dict) -> [dict, int]:
-        current_data = self.guild_web_hooks.find_one({'_id': "{guild_id}".format(guild_id=guild_id)})
-        Logger.log_database("SET-WEBHOOK: Guild with Id: {} returned with results: {}".format(guild_id, None))
-        if current_data is not None:
-            QUERY = {'_id': f"{guild_id}"}
-            new_data = {'config': config}
-            resp = self.guild_web_hooks.update_one(QUERY, {'$set': new_data})
-            return resp.raw_result
-        else:
-            data = {'_id': f"{guild_id}", 'config': config}
-            resp = self.guild_web_hooks.insert_one(data)
-            return resp.inserted_id
+    def set_guild_webhooks(self, guild_id: int, config: dict) -> dict:
+        resp = upsert(self.guild_web_hooks, f"{guild_id}", {'config': config})
+        Logger.log_database("SET-WEBHOOK: Guild with Id: {} returned with results: {}".format(guild_id, resp))
+        return resp
 
     @Timer.timeit
     def delete_guild_webhooks(self, guild_id: int):
@@ -87,27 +85,42 @@ class UserTracking:
             "watchlist": self.db["watchlist"],
             "recommended": self.db["recommendedlist"],
         }
+        self.write_buffer = WriteBuffer(self.collections)
 
-    def set_user_data(self, area: str, user_id: int, contents: dict) -> [dict, int]:
-        current_data = self.collections[area].find_one({'_id': user_id})
-        Logger.log_database("SET-USER: User Content with Id: {} returned.".format(user_id))
+    def set_user_data(self, area: str, user_id: int, contents: dict):
+        """ Buffered, the write is sent by the WriteBuffer on its next flush """
+        self.write_buffer.queue(area, user_id, {'$set': contents})
+        Logger.log_database("SET-USER: User Content with Id: {} queued.".format(user_id))
+
+    def push_user_content(self, area: str, user_id: int, item: dict):
+        """ Appends a single item to the user's contents without resending the rest of the list """
+        self.write_buffer.queue(area, user_id, {'$push': {'contents': item}, '$setOnInsert': {'firewall': True}})
+        Logger.log_database("PUSH-USER: User Content with Id: {} queued.".format(user_id))
+
+    def remove_user_content(self, area: str, user_id: int, index: int):
+        """
+        Removes the item at `index` from the user's contents, positional removal needs
+        an $unset followed by a $pull of the left over null, both are flushed in one bulk write.
+        """
+        self.write_buffer.queue(area, user_id,
+                                {'$unset': {f'contents.{index}': 1}},
+                                {'$pull': {'contents': None}},
+                                upsert=False)
+        Logger.log_database("PULL-USER: User Content with Id: {} queued.".format(user_id))
 
-        if current_data is not None:
-            QUERY = {'_id': user_id}
-            resp = self.collections[area].update_one(QUERY, {'$set': contents})
-            return resp.raw_result
-        else:
-            data = {'_id': user_id, **contents}
-            resp = self.collections[area].insert_one(data)
-            return resp.inserted_id
+    def set_user_firewall(self, area: str, user_id: int, public: bool):
+        self.write_buffer.queue(area, user_id, {'$set': {'firewall': public}})
+        Logger.log_database("SET-FIREWALL: User Content with Id: {} queued.".format(user_id))
 
     def reset_user_data(self, area: str, user_id: int):
+        self.write_buffer.flush_key(area, user_id)
         _ = self.collections[area].find_one_and_delete({'_id': user_id})
         Logger.log_database(
             "DELETE-USER: Guild with Id: {} returned.".format(user_id))
         return "COMPLETE"
 
     def get_user_data(self, area: str, user_id: int) -> dict:
+        self.write_buffer.flush_key(area, user_id)
         current_data = self.collections[area].find_one({'_id': user_id})
         return current_data if current_data is not None else {'_id': user_id, 'firewall': True, 'contents': []}
 
@@ -125,11 +138,11 @@ class Votes:
         return returned if returned is not None else {'user_id': user_id, 'expires_in': None}
 
     def add_vote(self, user_id, expires_in):
-        self.votes.insert_one({'_id': f"{user_id}", 'expires_in': expires_in})
+        upsert(self.votes, f"{user_id}", {'expires_in': expires_in})
         Logger.log_database("SET-VOTE: User Content with Id: {} returned.".format(user_id))
 
     def update_vote(self, user_id, expires_in):
-        self.votes.find_one_and_update({'_id': f"{user_id}"}, {'$set': {'expires_in': expires_in}})
+        self.votes.find_one_and_update({'_id': f"{user_id}"}, stamped({'$set': {'expires_in': expires_in}}))
         Logger.log_database("SET-VOTE: User Content with Id: {} returned.".format(user_id))
 
     def remove_vote(self, user_id):
@@ -182,14 +195,25 @@ class MongoDatabase(GuildData, UserTracking, GuildWebhooks, Votes):
             "watchlist": self.db["watchlist"],
             "recommended": self.db["recommendedlist"],
         }
+        self.write_buffer = WriteBuffer(self.collections)
         self.guild_web_hooks = self.db["webhooks"]
         self.votes = self.db['votes']
         super().__init__(self.db)
 
     def close_conn(self):
-        """ Logs us out of the data """
+        """ Flushes any buffered writes and logs us out of the data """
+        self.write_buffer.flush()
         self.db.logout()
 
+    def create_invalidation_indexes(self, collection_names):
+        """ Index on the `updated_at` stamp, what the InvalidationBus polls on without change streams """
+        for name in collection_names:
+            self.db[name].create_index('updated_at')
+
 
 if __name__ == "__main__":
+    # python -m data.database, one off setup of the indexes the bot expects
+    from main import INVALIDATION_ROUTES
     db = MongoDatabase()
+    db.create_invalidation_indexes(INVALIDATION_ROUTES)
+    print(f"Indexed `updated_at` on {', '.join(INVALIDATION_ROUTES)}")
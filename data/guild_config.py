@@ -19,26 +19,48 @@ class GuildConfig:
         :returns GuildConfig object:
     """
 
-    def __init__(self, guild_id, database):
+    def __init__(self, guild_id, database, data: dict = None):
         """
         :param guild_id:
         :param database: -> Optional
         If data is None it falls back to a global var,
         THIS ONLY EXISTS WHEN RUNNING THE FILE AS MAIN!
+        :param data: -> Optional
+        Already fetched settings, skips the database lookup.
         On creation the class calls the data getting the guild settings
         if prefix is None it reverts back to `-`, this should never happen
         under normal circumstances.
         Premium by default is False and will default to False in case of
         failure.
+        `exists` is False when the guild has no settings stored and runs on defaults.
         """
         self.guild_id = guild_id
         self._db = database
-        data = self._db.get_guild_config(guild_id=guild_id)
+        if data is None:
+            data = self._db.find_guild_config(guild_id=guild_id)
+        self.exists = data is not None
+        data = dict(data if data is not None else Settings.settings)
 
         self.prefix = data.pop('prefix', '-')  # Emergency safe guard
         self.premium = data.pop('premium', False)  # Emergency safe guard
         self.nsfw_enabled = data.pop('nsfw_enabled', True)  # Emergency safe guard
 
+    @property
+    def prefix(self) -> str:
+        return self._prefix
+
+    @prefix.setter
+    def prefix(self, new_prefix: str):
+        self._prefix = new_prefix
+        self.prefix_lower = new_prefix.lower()  # on_message matches this against lower cased messages
+
+    @classmethod
+    def default(cls, guild_id, database):
+        """ A config running on the default settings, built without touching the database """
+        config = cls(guild_id, database, data=Settings.settings)
+        config.exists = False
+        return config
+
     def set_prefix(self, new_prefix) -> str:
         """
         This function sets it's own attr to the new prefix then
@@ -47,6 +69,7 @@ class GuildConfig:
         """
         self.prefix = new_prefix
         self._db.set_guild_config(self.guild_id, config=self.to_dict())
+        self.exists = True
         return self.prefix
 
     def reset_prefix(self) -> str:
@@ -56,11 +79,13 @@ class GuildConfig:
         """
         self.prefix = Settings.settings.get('prefix', '-')
         self._db.set_guild_config(self.guild_id, config=self.to_dict())
+        self.exists = True
         return self.prefix
 
     def toggle_nsfw(self):
         self.nsfw_enabled = not self.nsfw_enabled
         self._db.set_guild_config(self.guild_id, config=self.to_dict())
+        self.exists = True
         return self.nsfw_enabled
 
     def to_dict(self):
@@ -0,0 +1,16 @@
+def stamped(update: dict) -> dict:
+    """
+    Adds the server side `updated_at` stamp to an update document,
+    the cache invalidation poller uses it to find changed documents.
+    """
+    return {**update, '$currentDate': {'updated_at': True}}
+
+
+def upsert(collection, _id, fields: dict) -> dict:
+    """
+    Sets `fields` on the document matching `_id`, creating the document if it
+    does not exist yet, in a single atomic round trip.
+    :returns raw_result:
+    """
+    resp = collection.update_one({'_id': _id}, stamped({'$set': fields}), upsert=True)
+    return resp.raw_result
@@ -0,0 +1,107 @@
+import threading
+from datetime import datetime
+
+from pymongo.errors import OperationFailure, PyMongoError
+
+from logger import Logger
+
+
+class InvalidationBus:
+    """
+        Keeps a process' CacheManager in sync with writes made by every other bot process,
+        any change to a watched collection evicts the matching cache entry so the next read
+        reloads it from Mongo. Changes are read from a change stream on the database, servers
+        that don't support change streams (standalone mongod) are polled instead on the
+        `updated_at` stamp every write sets. Polling can't see deletes, those still wait for
+        the entry's TTL, and expects the `updated_at` index from `python -m data.database`.
+        + Usage:
+            - bus = InvalidationBus(bot.cache, bot.database.db, {'guilds': ('guilds', None)})
+            - bus.start(loop)
+    """
+
+    def __init__(self, cache, db, routes: dict, poll_interval: float = 5.0):
+        """
+        :param cache: The CacheManager entries are evicted from.
+        :param db: The pymongo database holding the watched collections.
+        :param routes: Mapping of collection name to (cache store name, key function),
+        the key function turns a document's _id into the cache key, None uses the _id as is.
+        :param poll_interval: Seconds between polls when change streams aren't supported.
+        """
+        self.cache = cache
+        self.db = db
+        self.routes = routes
+        self.poll_interval = poll_interval
+        self.mode = None  # 'watch' or 'poll' once started
+        self._loop = None
+        self._thread = None
+        self._stopped = threading.Event()
+        self._resume_token = None
+        self._last_seen = {}
+
+    def start(self, loop):
+        self._loop = loop
+        self._thread = threading.Thread(target=self._run, name="cache-invalidation", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stopped.set()
+
+    def _evict(self, collection_name: str, _id):
+        store, to_key = self.routes[collection_name]
+        try:
+            key = to_key(_id) if to_key is not None else _id
+        except (TypeError, ValueError):
+            return
+        self._loop.call_soon_threadsafe(self.cache.invalidate, store, key)
+
+    def _clear_all(self):
+        """ Used when changes may have been missed, nothing cached can be trusted anymore """
+        for store, _ in self.routes.values():
+            self._loop.call_soon_threadsafe(self.cache.clear, store)
+
+    def _run(self):
+        while not self._stopped.is_set():
+            try:
+                if self.mode == 'poll':
+                    self._poll()
+                else:
+                    self._watch()
+            except OperationFailure as e:
+                if self.mode is None:
+                    Logger.log_cache("[ INVALIDATION ] | Change streams unavailable ({}), polling every {}s".format(
+                        e, self.poll_interval), error=True)
+                    self.mode = 'poll'
+                    continue
+                if self.mode == 'watch' and self._resume_token is not None:
+                    self._resume_token = None  # Can't resume from it, changes since then are lost
+                    self._clear_all()
+                Logger.log_cache("[ INVALIDATION ] | {} failed: {}".format(self.mode, e), error=True)
+                self._stopped.wait(self.poll_interval)
+            except PyMongoError as e:
+                Logger.log_cache("[ INVALIDATION ] | {} failed: {}".format(self.mode, e), error=True)
+                self._stopped.wait(self.poll_interval)
+
+    def _watch(self):
+        pipeline = [{'$match': {'ns.coll': {'$in': list(self.routes)}}}]
+        with self.db.watch(pipeline, resume_after=self._resume_token, max_await_time_ms=1000) as stream:
+            self.mode = 'watch'
+            while not self._stopped.is_set():
+                change = stream.try_next()
+                self._resume_token = stream.resume_token
+                if change is not None and 'documentKey' in change:
+                    self._evict(change['ns']['coll'], change['documentKey']['_id'])
+
+    def _poll(self):
+        for name in self.routes:
+            if name in self._last_seen:
+                continue
+            newest = self.db[name].find_one({'updated_at': {'$exists': True}}, {'updated_at': 1},
+                                            sort=[('updated_at', -1)])
+            self._last_seen[name] = newest['updated_at'] if newest is not None else datetime.min
+
+        while not self._stopped.wait(self.poll_interval):
+            for name in self.routes:
+                changed = self.db[name].find({'updated_at': {'$gt': self._last_seen[name]}}, {'updated_at': 1})
+                for doc in changed:
+                    self._last_seen[name] = max(self._last_seen[name], doc['updated_at'])
+                    self._evict(name, doc['_id'])
@@ -24,20 +24,12 @@ class BasicTracker:
 
     def add_content(self, data: dict):
         self._contents.append(data)
-        self._db.set_user_data(
-            area=self.type,
-            user_id=self.user_id,
-            contents={'contents': self._contents,
-                      'firewall': self.public})
+        self._db.push_user_content(area=self.type, user_id=self.user_id, item=data)
         return self._contents
 
     def remove_content(self, index: int):
         temp = self._contents.pop(index)
-        self._db.set_user_data(
-            area=self.type,
-            user_id=self.user_id,
-            contents={'contents': self._contents,
-                      'firewall': self.public})
+        self._db.remove_user_content(area=self.type, user_id=self.user_id, index=index)
         return temp
 
     def get_blocks(self):
@@ -58,9 +50,7 @@ class BasicTracker:
 
     def toggle_public(self):
         self.public = not self.public
-        self._db.set_user_data(area=self.type, user_id=self.user_id,
-                               contents={'contents': self._contents,
-                                         'firewall': self.public})
+        self._db.set_user_firewall(area=self.type, user_id=self.user_id, public=self.public)
         return self.public
 
     @property
@@ -82,20 +72,6 @@ class UserRecommended(BasicTracker):
     def __init__(self, user_id, database=None):
         super().__init__(user_id, type_="recommended", database=database)
 
-    def add_content(self, data: dict):
-        self._contents.append(data)
-        self._db.set_user_data(area=self.type, user_id=self.user_id,
-                               contents={'contents': self._contents,
-                                         'firewall': self.public})
-        return self._contents
-
-    def remove_content(self, index: int):
-        deleted = self._contents.pop(index)
-        self._db.set_user_data(area=self.type, user_id=self.user_id,
-                               contents={'contents': self._contents,
-                                         'firewall': self.public})
-        return deleted
-
 
 if __name__ == "__main__":
     db = MongoDatabase()
@@ -0,0 +1,171 @@
+import asyncio
+import threading
+
+from pymongo import UpdateOne
+from pymongo.errors import BulkWriteError, ServerSelectionTimeoutError
+
+from data.helpers import stamped
+from logger import Logger
+
+MERGEABLE_OPERATORS = {'$set', '$setOnInsert', '$push'}
+
+
+class WriteBuffer:
+    """
+        Write-behind buffer sitting in front of the Mongo setters, mutations are queued
+        per (area, _id) and coalesced so a burst of edits from one user ends up as a
+        handful of update operations, these are sent with one bulk_write per collection
+        either on the background interval or once `max_pending` keys are waiting.
+        Reads of a key with pending writes must call `flush_key` first.
+    """
+
+    def __init__(self, collections: dict, max_pending: int = 250, interval: float = 2.0):
+        """
+        :param collections: Mapping of area name to pymongo collection.
+        :param max_pending: Amount of buffered keys that forces an immediate flush.
+        :param interval: Seconds between background flushes.
+        """
+        self.collections = collections
+        self.max_pending = max_pending
+        self.interval = interval
+        self._pending = {}
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+
+    def queue(self, area: str, _id, *updates: dict, upsert: bool = True):
+        """ Buffers one or more update documents (e.g. {'$set': {...}}) for the given key """
+        with self._lock:
+            pending = self._pending.setdefault((area, _id), [])
+            for update in updates:
+                self._merge(pending, update, upsert)
+            should_flush = len(self._pending) >= self.max_pending
+        if should_flush:
+            self.flush()
+
+    @staticmethod
+    def _merge(pending: list, update: dict, upsert: bool):
+        """ Coalesces the new update into the pending operations for a key """
+        if list(update) == ['$set']:
+            fields = set(update['$set'])
+            touched = set()
+            for op, _ in pending:
+                for values in op.values():
+                    touched.update(values)
+            if touched and touched <= fields:  # This $set overrides everything still waiting
+                pending.clear()
+
+        if pending:
+            last, last_upsert = pending[-1]
+            mergeable = set(update) == set(last) and set(update) <= MERGEABLE_OPERATORS and last_upsert == upsert
+            if mergeable and set(update.get('$push', {})) == set(last.get('$push', {})):
+                for op, values in update.items():
+                    if op != '$push':
+                        last[op].update(values)
+                        continue
+                    for field, value in values.items():
+                        current = last['$push'][field]
+                        if not (isinstance(current, dict) and '$each' in current):
+                            current = last['$push'][field] = {'$each': [current]}
+                        current['$each'].append(value)
+                return
+        pending.append(({op: dict(values) for op, values in update.items()}, upsert))
+
+    def _take(self, keys=None) -> dict:
+        with self._lock:
+            if keys is None:
+                taken, self._pending = self._pending, {}
+            else:
+                taken = {key: self._pending.pop(key) for key in keys if key in self._pending}
+        return taken
+
+    def _restore(self, taken: dict):
+        """ Puts operations that failed to write back in front of anything queued since """
+        with self._lock:
+            for key, operations in taken.items():
+                self._pending[key] = operations + self._pending.get(key, [])
+
+    @staticmethod
+    def _group(operations: list) -> dict:
+        """ [(key, (update, upsert)), ...] back into {key: [(update, upsert), ...]}, order kept """
+        grouped = {}
+        for key, operation in operations:
+            grouped.setdefault(key, []).append(operation)
+        return grouped
+
+    def _write(self, taken: dict):
+        by_area = {}
+        for (area, _id), operations in taken.items():
+            by_area.setdefault(area, {})[(area, _id)] = operations
+
+        areas = list(by_area)
+        for i, area in enumerate(areas):
+            operations = [(key, operation) for key, ops in by_area[area].items() for operation in ops]
+            written = modified = 0
+            while operations:
+                requests = [UpdateOne({'_id': key[1]}, stamped(update), upsert=upsert)
+                            for key, (update, upsert) in operations]
+                try:
+                    resp = self.collections[area].bulk_write(requests, ordered=True)
+                except BulkWriteError as e:
+                    # Ordered, so everything before the first failed op landed and must not be replayed,
+                    # the failed op is dropped as retrying a bad document would block every write after it
+                    errors = e.details.get('writeErrors')
+                    if not errors:  # Only the write concern failed, every op was applied
+                        Logger.log_database("FLUSH-{}: Write concern error: {}".format(
+                            area.upper(), e.details.get('writeConcernErrors')), error=True)
+                        written += len(operations)
+                        break
+                    failed = errors[0]['index']
+                    (_, _id), (update, _) = operations[failed]
+                    Logger.log_database("FLUSH-{}: Dropped {} for {}: {}".format(
+                        area.upper(), update, _id, errors[0].get('errmsg')), error=True)
+                    written += failed
+                    operations = operations[failed + 1:]
+                    continue
+                except ServerSelectionTimeoutError:
+                    # No server was reached, nothing still queued for this area can have been applied
+                    self._restore(self._group(operations))
+                    for remaining in areas[i + 1:]:
+                        self._restore(by_area[remaining])
+                    raise
+                except Exception:
+                    # Part of the batch may have landed and $push / $unset aren't idempotent, so it's dropped
+                    Logger.log_database("FLUSH-{}: Dropped {} buffered operations after a failed write".format(
+                        area.upper(), len(requests)), error=True)
+                    for remaining in areas[i + 1:]:
+                        self._restore(by_area[remaining])
+                    raise
+                written += len(operations)
+                modified += resp.modified_count
+                break
+            Logger.log_database("FLUSH-{}: Wrote {} buffered operations, modified: {}".format(
+                area.upper(), written, modified))
+
+    def flush(self):
+        """ Writes every pending mutation, blocking so call it from an executor """
+        with self._flush_lock:
+            self._write(self._take())
+
+    def flush_key(self, area: str, _id):
+        """
+        Writes the pending mutations for a single key so a following read sees them,
+        also waits out a flush in progress as it may have already taken this key.
+        """
+        with self._flush_lock:
+            if (area, _id) in self._pending:
+                self._write(self._take(keys=[(area, _id)]))
+
+    @property
+    def pending(self) -> int:
+        return len(self._pending)
+
+    async def background_task(self, executor=None):
+        loop = asyncio.get_event_loop()
+        while True:
+            await asyncio.sleep(self.interval)
+            if self._pending:
+                try:
+                    await loop.run_in_executor(executor, self.flush)
+                except Exception as e:
+                    Logger.log_database("[ BACKGROUND TASK ] | Failed to flush write buffer: {}".format(e),
+                                        error=True)
@@ -1,10 +1,133 @@
 from colorama import Fore, Style
 from datetime import datetime
+from profiler import Profiler
+import atexit
 import colorama
+import json
+import os
+import queue
+import threading
 import time
 colorama.init()
 
 
+class ConsoleSink:
+    """ The original coloured console output """
+
+    COLOURS = {
+        'shard_connect': Fore.LIGHTCYAN_EX,
+        'shard_disconnect': Fore.LIGHTRED_EX,
+        'info': Fore.LIGHTGREEN_EX,
+        'database': Fore.MAGENTA,
+        'cache': Fore.LIGHTBLUE_EX,
+        'rss': Fore.YELLOW,
+        'broadcast': Fore.YELLOW,
+        'dbl': Fore.LIGHTMAGENTA_EX,
+    }
+
+    def write(self, records: list):
+        lines = []
+        for timestamp, category, label, msg, _ in records:
+            lines.append(Style.BRIGHT + Fore.BLUE +
+                         f"[{datetime.fromtimestamp(timestamp).strftime('%a %m %b | %H:%M:%S')}]" +
+                         self.COLOURS.get(category, Fore.WHITE) + f"[ {label} ] " +
+                         Fore.WHITE + msg + Fore.WHITE)
+        print("\n".join(lines), flush=True)
+
+    def close(self):
+        pass
+
+
+class JsonLinesSink:
+    """ One JSON object per line, rotated to path.1 ... path.N once the file passes max_bytes """
+
+    def __init__(self, path: str, max_bytes: int = 10 * 1024 * 1024, backup_count: int = 5):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.backup_count = backup_count
+        self._file = open(path, 'a', encoding='utf-8')
+
+    def _rotate(self):
+        self._file.close()
+        for i in range(self.backup_count - 1, 0, -1):
+            if os.path.exists(f"{self.path}.{i}"):
+                os.replace(f"{self.path}.{i}", f"{self.path}.{i + 1}")
+        if self.backup_count > 0:
+            os.replace(self.path, f"{self.path}.1")
+        else:
+            os.remove(self.path)
+        self._file = open(self.path, 'a', encoding='utf-8')
+
+    def write(self, records: list):
+        self._file.write("".join(
+            json.dumps({'time': timestamp, 'category': category, 'message': msg, 'error': error}) + "\n"
+            for timestamp, category, _, msg, error in records))
+        self._file.flush()
+        if self._file.tell() >= self.max_bytes:
+            self._rotate()
+
+    def close(self):
+        self._file.close()
+
+
+class LogBackend:
+    """
+        Background thread writing queued log records to the sinks in batches,
+        so logging from the event loop is a flag check and a queue put.
+    """
+
+    def __init__(self, sinks: list, batch_size: int = 256, interval: float = 0.5):
+        self.sinks = sinks
+        self.batch_size = batch_size
+        self.interval = interval
+        self._queue = queue.SimpleQueue()
+        self._thread = threading.Thread(target=self._run, name="log-writer", daemon=True)
+        self._thread.start()
+
+    def put(self, record: tuple):
+        self._queue.put(record)
+
+    def _drain(self, first=None) -> list:
+        batch = [] if first is None else [first]
+        while len(batch) < self.batch_size:
+            try:
+                batch.append(self._queue.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    def _write(self, batch: list):
+        for sink in self.sinks:
+            try:
+                sink.write(batch)
+            except Exception as e:  # A broken sink must not take the other ones down
+                print(f"Log sink {type(sink).__name__} failed: {e}")
+
+    def _run(self):
+        while True:
+            try:
+                record = self._queue.get(timeout=self.interval)
+            except queue.Empty:
+                continue
+            if record is None:
+                break
+            batch = self._drain(record)
+            stop = None in batch
+            self._write([r for r in batch if r is not None])
+            if stop:
+                break
+
+    def close(self):
+        """ Writes whatever is still queued and closes the sinks """
+        self._queue.put(None)
+        self._thread.join(timeout=5)
+        remaining = [r for r in self._drain() if r is not None]
+        if remaining:
+            self._write(remaining)
+        for sink in self.sinks:
+            sink.close()
+
+
 class Logger:
     to_store_in_file = []
 
@@ -18,90 +141,88 @@ class Logger:
     LOG_RSS = True
     LOG_BROADCASTS = True
 
+    backend = None
+
+    @classmethod
+    def configure(cls, console: bool = True, json_path: str = None,
+                  max_bytes: int = 10 * 1024 * 1024, backup_count: int = 5):
+        """
+        Replaces the log sinks, by default records only go to the coloured console.
+        :param console: Keep the coloured console output.
+        :param json_path: -> Optional
+        File to write JSON lines to, rotated once it passes max_bytes keeping backup_count old files.
+        """
+        sinks = [ConsoleSink()] if console else []
+        if json_path is not None:
+            sinks.append(JsonLinesSink(json_path, max_bytes=max_bytes, backup_count=backup_count))
+        if cls.backend is not None:
+            cls.backend.close()
+        cls.backend = LogBackend(sinks)
+
+    @classmethod
+    def _emit(cls, enabled: bool, category: str, label: str, msg: str, error: bool):
+        """ Nothing is formatted here, the backend thread does that for records that pass the flag """
+        if not enabled:
+            return
+        if cls.backend is None:
+            cls.configure()
+        cls.backend.put((time.time(), category, label, msg, error))
+
     @classmethod
     def log_shard_connect(cls, shard_id, error=False):
-        text = (Style.BRIGHT + Fore.BLUE + f"[{datetime.now().strftime('%a %m %b | %H:%M:%S')}]" +
-                Fore.LIGHTCYAN_EX + "[ Shard Connected ] " +
-                Fore.CYAN + f" Shard {shard_id}  | " +
-                Fore.WHITE + "CONNECTED!")
-        if cls.LOG_CONNECTS or error:
-            print(text)
+        cls._emit(cls.LOG_CONNECTS or error, 'shard_connect', "Shard Connected",
+                  f"Shard {shard_id}  | CONNECTED!", error)
 
     @classmethod
     def log_shard_disconnect(cls, error=False):
-        text = (Style.BRIGHT + Fore.BLUE + f"[{datetime.now().strftime('%a %m %b | %H:%M:%S')}]" +
-                Fore.LIGHTRED_EX + "[ Shard Disconnected ] " +
-                Fore.CYAN + f" Shard UNKNOWN  | " +
-                Fore.WHITE + "LOST CONNECTION!")
-        if cls.LOG_DISCONNECTS or error:
-            print(text)
+        cls._emit(cls.LOG_DISCONNECTS or error, 'shard_disconnect', "Shard Disconnected",
+                  "Shard UNKNOWN  | LOST CONNECTION!", error)
 
     @classmethod
     def log_info(cls, msg, error=False):
-        text = (Style.BRIGHT + Fore.BLUE + f"[{datetime.now().strftime('%a %m %b | %H:%M:%S')}]" +
-                Fore.LIGHTGREEN_EX + "[ Info ] " +
-                Fore.WHITE + msg + Fore.WHITE)
-        if cls.LOG_INFO or error:
-            print(text)
+        cls._emit(cls.LOG_INFO or error, 'info', "Info", msg, error)
 
     @classmethod
     def log_database(cls, msg, error=False):
-        text = (Style.BRIGHT + Fore.BLUE + f"[{datetime.now().strftime('%a %m %b | %H:%M:%S')}]" +
-                Fore.MAGENTA + "[ Database ] " +
-                Fore.WHITE + msg + Fore.WHITE)
-        if cls.LOG_DATABASE or error:
-            print(text)
+        cls._emit(cls.LOG_DATABASE or error, 'database', "Database", msg, error)
 
     @classmethod
     def log_cache(cls, msg, error=False):
-        text = (Style.BRIGHT + Fore.BLUE + f"[{datetime.now().strftime('%a %m %b | %H:%M:%S')}]" +
-                Fore.LIGHTBLUE_EX + "[ Cache ] " +
-                Fore.WHITE + msg + Fore.WHITE)
-        if cls.LOG_CACHE or error:
-            print(text)
+        cls._emit(cls.LOG_CACHE or error, 'cache', "Cache", msg, error)
 
     @classmethod
     def log_rss(cls, msg, error=False):
-        text = (Style.BRIGHT + Fore.BLUE + f"[{datetime.now().strftime('%a %m %b | %H:%M:%S')}]" +
-                Fore.YELLOW + "[ RSS ] " +
-                Fore.WHITE + msg + Fore.WHITE)
-        if cls.LOG_RSS or error:
-            print(text)
+        cls._emit(cls.LOG_RSS or error, 'rss', "RSS", msg, error)
 
     @classmethod
     def log_broadcast(cls, msg, error=False):
-        text = (Style.BRIGHT + Fore.BLUE + f"[{datetime.now().strftime('%a %m %b | %H:%M:%S')}]" +
-                Fore.YELLOW + "[ BROADCASTS ] " +
-                Fore.WHITE + msg + Fore.WHITE)
-        if cls.LOG_BROADCASTS or error:
-            print(text)
+        cls._emit(cls.LOG_BROADCASTS or error, 'broadcast', "BROADCASTS", msg, error)
 
     @classmethod
     def log_dbl(cls, msg, error=False):
-        text = (Style.BRIGHT + Fore.BLUE + f"[{datetime.now().strftime('%a %m %b | %H:%M:%S')}]" +
-                Fore.LIGHTMAGENTA_EX + "[ TOP.GG ] " +
-                Fore.WHITE + msg + Fore.WHITE)
-        if cls.LOG_BROADCASTS or error:
-            print(text)
+        cls._emit(cls.LOG_BROADCASTS or error, 'dbl', "TOP.GG", msg, error)
+
+    @classmethod
+    def close(cls):
+        if cls.backend is not None:
+            cls.backend.close()
+            cls.backend = None
+
+
+atexit.register(Logger.close)
 
 
 class Timer:
-    timings = {}
+    """ Kept for existing decorators, timings are recorded by the Profiler in profiler.py """
 
     @classmethod
     def fetch_timings(cls):
-        return cls.timings
+        return Profiler.summaries()
 
     @classmethod
     def reset_timings(cls):
-        cls.timings = {}
+        Profiler.reset()
 
     @classmethod
     def timeit(cls, func):
-        def wrapper(*args, **kwargs):
-            start_time = time.time()
-            output = func(*args, **kwargs)
-            end_time = time.time()
-            cls.timings[str(func.__qualname__)] = end_time - start_time
-            return output
-        return wrapper
+        return Profiler.timeit(func)
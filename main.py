@@ -2,7 +2,7 @@ import discord
 import os
 import json
 import asyncio
-import aiohttp
+import time
 import traceback
 import logging
 
@@ -13,9 +13,14 @@ from random import choice
 from concurrent import futures
 
 from data.database import MongoDatabase
-from data.cachemanager import CacheManager, Store
+from data.async_database import AsyncDatabase
+from data.cachemanager import CacheManager, Store, MISSING
+from data.invalidation import InvalidationBus
 from logger import Logger
+from profiler import Profiler
 from data import guild_config
+from utils.instrumentation import Instrumentation
+from utils.http import create_session
 from resources.archieve.anime_examples import WATCHLIST
 
 try:
@@ -35,19 +40,36 @@ with open('default_settings.json', 'r') as file:
 
 # Some constants we need to define before everything else.
 DEFAULT_PREFIX = settings.get("prefix", "-")
+DEFAULT_PREFIX_LOWER = DEFAULT_PREFIX.lower()
 TOKEN = config.get("token")
 DEVELOPER_IDS = config.get("dev_ids")
 SHARD_COUNT = config.get("shard_count")
+METRICS_PORT = config.get("metrics_port")  # Each cluster serves /metrics on METRICS_PORT + cluster_id
+PRELOAD_BATCH_SIZE = 1000
 COLOUR = 0xe87e15
 ICON = "https://cdn.discordapp.com/app-icons/656598065532239892/39344a26ba0c5b2c806a60b9523017f3.png"
 
-# Setup required cache to run the bot
+# Setup required cache to run the bot,
+# [name, ttl, optional Store options (max_entries, max_bytes, policy, negative_time)]
+# guilds and votes TTLs are long since writes from any process evict them through the INVALIDATION_ROUTES.
 REQUIRED_CACHE = [
-    ['guilds', timedelta(minutes=60)],
-    ['votes', timedelta(minutes=1)],
-    ['characters', timedelta(minutes=1)],
+    ['guilds', timedelta(hours=6), {'max_entries': 100_000, 'policy': 'lfu', 'negative_time': timedelta(hours=6)}],
+    ['votes', timedelta(minutes=10), {'max_entries': 50_000, 'policy': 'lru', 'negative_time': timedelta(minutes=10)}],
+    ['characters', timedelta(minutes=1), {'max_entries': 2_000, 'max_bytes': 256 * 1024 * 1024, 'policy': 'lru'}],
 ]
 
+# Mongo collections whose writes evict cache entries, {collection: (cache store, cache key from the _id)}
+INVALIDATION_ROUTES = {
+    'guilds': ('guilds', None),
+    'votes': ('votes', int),
+    # collected_characters isn't routed, a cached UserCharacters is live state that pending reactions
+    # still write through, evicting it on our own writes would let a reloaded copy overwrite them.
+    # It keeps its short TTL instead.
+}
+
+# Time every public database method, see the `timings` owner command
+Profiler.instrument_class(MongoDatabase)
+
 # Configure logger
 Logger.LOG_CACHE = False
 Logger.LOG_DATABASE = False
@@ -55,20 +77,48 @@ pool = futures.ThreadPoolExecutor()
 
 
 class CrunchyBot(commands.AutoShardedBot):
-    def __init__(self, **options):
+    def __init__(self, cluster_id=0, guild_counts=None, **options):
+        """
+        :param cluster_id: Index of this process when running under cluster.py.
+        :param guild_counts: -> Optional
+        Shared array of guild counts per cluster, None when running on our own.
+        """
         super().__init__("", **options)
+        self.cluster_id = cluster_id
+        self.guild_counts = guild_counts
         self.before_invoke(self.get_config)
+        self.instrumentation = Instrumentation(self, executor=pool)
+        self.after_invoke(self.instrumentation.command_finished)
         self.owner_ids = DEVELOPER_IDS
         self.colour = COLOUR
         self.icon = ICON
         self.database = MongoDatabase()
+        self.async_database = AsyncDatabase(self.database, executor=pool)
         self.cache = CacheManager()
-        self.error_handler = ErrorHandler()
+        self.error_handler = ErrorHandler(self)
+        self._http_session = None
         for collection in REQUIRED_CACHE:
-            self.cache.add_cache_store(Store(name=collection[0], max_time=collection[1]))
+            options = collection[2] if len(collection) > 2 else {}
+            self.cache.add_cache_store(Store(name=collection[0], max_time=collection[1], **options))
         asyncio.get_event_loop().create_task(self.cache.background_task())
+        asyncio.get_event_loop().create_task(self.database.write_buffer.background_task(pool))
+        self.invalidation = InvalidationBus(self.cache, self.database.db, INVALIDATION_ROUTES)
+        self.invalidation.start(asyncio.get_event_loop())
+        asyncio.get_event_loop().create_task(self.instrumentation.monitor_loop())
+        if METRICS_PORT is not None:
+            asyncio.get_event_loop().create_task(self.instrumentation.start_server(port=METRICS_PORT + cluster_id))
         self.started = False
         self.allow_connections = False
+        self.mentions = ()
+        self._triggers = {}
+        self._preloaded_shards = set()
+
+    @property
+    def http_session(self):
+        """ Shared by every cog, `bot.http` is already discord.py's own client """
+        if self._http_session is None or self._http_session.closed:
+            self._http_session = create_session()
+        return self._http_session
 
     def startup(self):
         """
@@ -81,7 +131,8 @@ class CrunchyBot(commands.AutoShardedBot):
         if '__pycache__' in cogs_list:
             cogs_list.remove('__pycache__')
 
-        if not config.get("dbl_voting_enabled", False):
+        # Only one cluster listens for votes and posts the combined server count
+        if not config.get("dbl_voting_enabled", False) or self.cluster_id != 0:
             cogs_list.remove('top_gg_votes.py')
 
         for cog in cogs_list:
@@ -111,10 +162,67 @@ class CrunchyBot(commands.AutoShardedBot):
         print("Users Cached: ", len(self.users))
         """ Log any shard connects """
         Logger.log_shard_connect(shard_id=shard_id)
+        self.mentions = (f"<@{self.user.id}>", f"<@!{self.user.id}>")
+        self._triggers.clear()
+        self.update_guild_count()
+        if shard_id not in self._preloaded_shards:
+            self._preloaded_shards.add(shard_id)
+            self.loop.create_task(self.preload_guild_configs(shard_id))
         if not self.started:
             await self.on_ready_once()
         self.started = True
 
+    async def on_guild_join(self, guild):
+        self.update_guild_count()
+
+    async def on_guild_remove(self, guild):
+        self.update_guild_count()
+
+    def update_guild_count(self):
+        if self.guild_counts is not None:
+            self.guild_counts[self.cluster_id] = len(self.guilds)
+
+    def total_guild_count(self) -> int:
+        """ Guilds across every cluster when running under cluster.py, otherwise just ours """
+        if self.guild_counts is None:
+            return len(self.guilds)
+        self.update_guild_count()
+        return sum(self.guild_counts)
+
+    async def preload_guild_configs(self, shard_id):
+        """
+            Warms the guilds cache for every guild on a shard so the first messages after a
+            restart are served from memory, guilds without a document are negatively cached.
+            Guilds already cached are left alone.
+        """
+        guild_ids = [guild.id for guild in self.guilds if guild.shard_id == shard_id]
+        loaded = found = 0
+        try:
+            for i in range(0, len(guild_ids), PRELOAD_BATCH_SIZE):
+                batch = guild_ids[i:i + PRELOAD_BATCH_SIZE]
+                configs = await self.async_database.find_guild_configs(batch)
+                for guild_id in batch:
+                    # Only fills gaps, anything loaded or changed while the batch was in flight is newer
+                    data = configs.get(guild_id)
+                    config = MISSING if data is None else guild_config.GuildConfig(guild_id, self.database, data=data)
+                    self.cache.store_if_absent("guilds", guild_id, config)
+                loaded += len(batch)
+                found += len(configs)
+                Logger.log_info(f"Shard {shard_id} preload: {loaded}/{len(guild_ids)} guilds, {found} custom configs")
+        except Exception as e:
+            self._preloaded_shards.discard(shard_id)
+            Logger.log_info(f"Shard {shard_id} preload failed after {loaded} guilds: {e}", error=True)
+
+    async def close(self):
+        """ Make sure buffered writes land before we go down, extensions aren't unloaded on close """
+        from realms.static import Database as RealmsDatabase  # Already imported by the realms cogs
+        await self.async_database.run(self.database.write_buffer.flush)
+        await self.async_database.run(RealmsDatabase.db.write_buffer.flush)
+        self.invalidation.stop()
+        await super().close()
+        if self._http_session is not None:
+            await self._http_session.close()
+
     @classmethod
     async def on_disconnect(cls):
         """ Log when we loose a shard or connection """
@@ -123,36 +231,41 @@ class CrunchyBot(commands.AutoShardedBot):
     async def on_command_error(self, ctx, exception):
         await self.error_handler.process_error(ctx, exception)
 
-    def has_voted(self, user_id, force_db=False):
+    async def has_voted(self, user_id, force_db=False):
         if force_db:
-            has_voted = self.database.get_vote(user_id)
-            self.cache.store("votes", user_id, has_voted)
-            if has_voted.get('expires_in', None) is not None:
-                return 1
-            else:
-                return 0
-        has_voted = self.cache.get("votes", user_id)
-        if has_voted is not None:
-            if has_voted.get('expires_in', None) is not None:
-                return 1
-            else:
-                return 0
+            self.cache.invalidate("votes", user_id)
+        has_voted = await self.cache.get_or_load("votes", user_id, lambda: self._load_vote(user_id))
+        if has_voted is MISSING:
+            return 0
+        # Votes end by deletion, which a polling invalidation bus never sees, so the expiry is checked here
+        expires_in = has_voted.get('expires_in', None)
+        if expires_in is not None and float(expires_in) > time.time():
+            return 1
         else:
-            has_voted = self.database.get_vote(user_id)
-            self.cache.store("votes", user_id, has_voted)
-            if has_voted.get('expires_in', None) is not None:
-                return 1
-            else:
-                return 0
+            return 0
+
+    async def _load_vote(self, user_id):
+        vote = await self.async_database.get_vote(user_id)
+        return vote if vote.get('expires_in', None) is not None else MISSING
+
+    async def _load_guild_config(self, guild_id):
+        guild_data = await self.async_database.run(guild_config.GuildConfig, guild_id, self.database)
+        return guild_data if guild_data.exists else MISSING
+
+    async def get_guild_config(self, guild_id) -> guild_config.GuildConfig:
+        """ Fetches guild settings from cache or the database, guilds on defaults are negatively cached """
+        guild_data = await self.cache.get_or_load("guilds", guild_id, lambda: self._load_guild_config(guild_id))
+        if guild_data is MISSING:
+            return guild_config.GuildConfig.default(guild_id, self.database)
+        return guild_data
 
     async def get_config(self, context):
         """ Assign guild settings to context """
+        self.instrumentation.command_started(context)
+        if hasattr(context, 'guild_config'):  # Already resolved by on_message
+            return context
         if context.guild is not None:
-            guild_data = self.cache.get("guilds", context.guild.id)
-            if guild_data is None:
-                guild_data = await self.loop.run_in_executor(pool, guild_config.GuildConfig, context.guild.id,
-                                                             self.database)
-                self.cache.store("guilds", context.guild.id, guild_data)
+            guild_data = await self.get_guild_config(context.guild.id)
             setattr(context, 'guild_config', guild_data)
         else:
             setattr(context, 'guild_config', None)
@@ -164,57 +277,76 @@ class CrunchyBot(commands.AutoShardedBot):
         """ Fetches guild data either from cache or fetches it """
 
         if message.guild is not None and self.user.id != 641590528026083338:
-            guild_data = self.cache.get("guilds", message.guild.id)
-            if guild_data is None:
-                guild_data = await self.loop.run_in_executor(pool, guild_config.GuildConfig, message.guild.id,
-                                                             self.database)
-                self.cache.store("guilds", message.guild.id, guild_data)
+            guild_data = await self.get_guild_config(message.guild.id)
             return guild_data.prefix
         else:
             return DEFAULT_PREFIX
 
+    def get_triggers(self, prefix_lower: str) -> tuple:
+        """ Everything a command can start with for a lower cased prefix, built once per distinct prefix """
+        triggers = self._triggers.get(prefix_lower)
+        if triggers is None:
+            triggers = self._triggers[prefix_lower] = (prefix_lower, *self.mentions)
+        return triggers
+
     async def on_message(self, message):
-        """ Used for case insensitive prefix """
+        """
+            Used for case insensitive prefix, anything that isn't a command is dropped
+            after one startswith against the guild's triggers. The resolved config is
+            handed to the invocation so before_invoke doesn't look it up again.
+        """
         if not self.is_ready() or message.author.bot or not self.allow_connections:
             return
 
-        prefix = await self.get_custom_prefix(message)
-        if message.content.lower().startswith(prefix.lower()):
-            message.content = message.content[len(prefix):]
-            await self.process_commands(message=message)
-
-        elif message.content.startswith(f"<@{self.user.id}> "):
-            message.content = message.content[len(f"<@{self.user.id}> "):]
-            await self.process_commands(message=message)
+        guild_data = await self.get_guild_config(message.guild.id) if message.guild is not None else None
+        if guild_data is not None and self.user.id != 641590528026083338:
+            prefix, prefix_lower = guild_data.prefix, guild_data.prefix_lower
+        else:
+            prefix, prefix_lower = DEFAULT_PREFIX, DEFAULT_PREFIX_LOWER
 
-        elif message.content.startswith(f"<@!{self.user.id}> "):
-            message.content = message.content[len(f"<@!{self.user.id}> "):]
-            await self.process_commands(message=message)
+        content = message.content
+        lowered = content.lower()
+        if not lowered.startswith(self.get_triggers(prefix_lower)):
+            return
 
-        elif message.content.startswith(f"<@{self.user.id}>") or message.content.startswith(f"<@!{self.user.id}>"):
-            embed = discord.Embed(color=self.colour)
-            embed.set_author(name=f"My prefix is \"{prefix}\" do \"{prefix}help\" to get started.",
-                             icon_url=message.author.avatar_url)
+        if lowered.startswith(prefix_lower):
+            message.content = content[len(prefix):]
+        else:
+            mention = next(mention for mention in self.mentions if content.startswith(mention))
+            if not content.startswith(" ", len(mention)):
+                return await self.send_prefix_info(message, prefix)
+            message.content = content[len(mention) + 1:]
+
+        ctx = await self.get_context(message)
+        setattr(ctx, 'guild_config', guild_data)
+        setattr(ctx, 'prefix', prefix)
+        setattr(ctx, 'has_voted', self.has_voted)
+        await self.invoke(ctx)
+
+    async def send_prefix_info(self, message, prefix):
+        """ Reply to a bare mention with the guild's prefix """
+        embed = discord.Embed(color=self.colour)
+        embed.set_author(name=f"My prefix is \"{prefix}\" do \"{prefix}help\" to get started.",
+                         icon_url=message.author.avatar_url)
+        try:
+            await message.channel.send(embed=embed)
+        except discord.Forbidden:
             try:
-                await message.channel.send(embed=embed)
+                await message.author.send("Oops! I dont have the permissions to speak in that channel.")
             except discord.Forbidden:
-                try:
-                    await message.author.send("Oops! I dont have the permissions to speak in that channel.")
-                except discord.Forbidden:
-                    pass
+                pass
 
 
 class ErrorHandler:
-    def __init__(self):
-        self.session = None
+    def __init__(self, bot):
+        self.bot = bot
         self.ERROR_WEBHOOK_URL = config.get("error_webhook")
         self.webhook = None
 
     async def process_error(self, ctx, error):
-        if self.session is None:
-            self.session = aiohttp.ClientSession()
-            if self.webhook is None:
-                self.webhook = Webhook.from_url(self.ERROR_WEBHOOK_URL, adapter=AsyncWebhookAdapter(self.session))
+        if self.webhook is None:
+            self.webhook = Webhook.from_url(self.ERROR_WEBHOOK_URL,
+                                            adapter=AsyncWebhookAdapter(self.bot.http_session))
         error = getattr(error, 'original', error)
 
         if isinstance(error, commands.CommandNotFound):
@@ -283,7 +415,13 @@ async def change_presence(bot: CrunchyBot):
         print(e)
 
 
-if __name__ == "__main__":
+def run(shard_ids=None, cluster_id=0, guild_counts=None):
+    """ Runs the bot, by default with every shard in this process, cluster.py passes a subset """
+    log_file = config.get("log_file")  # JSON lines, each cluster gets its own file
+    if log_file is not None and guild_counts is not None:
+        log_file = f"{log_file}.cluster{cluster_id}"
+    Logger.configure(console=config.get("log_console", True), json_path=log_file)
+
     intents = discord.Intents.default()
     intents.members = False
     intents.emojis = False
@@ -296,8 +434,11 @@ if __name__ == "__main__":
     intents.reactions = True
 
     crunchy = CrunchyBot(
+        cluster_id=cluster_id,
+        guild_counts=guild_counts,
         case_insensitive=True,
         fetch_offline_member=False,
+        shard_ids=shard_ids,
         shard_count=SHARD_COUNT,
         heartbeat_timeout=60,
         intents=intents
@@ -305,3 +446,7 @@ if __name__ == "__main__":
     crunchy.startup()
     change_presence.start(crunchy)
     crunchy.run(TOKEN)
+
+
+if __name__ == "__main__":
+    run()
@@ -0,0 +1,129 @@
+import functools
+import inspect
+import threading
+import time
+from collections import deque
+
+SAMPLE_WINDOW = 2048  # Most recent samples kept per profile for the percentiles
+
+
+class Profile:
+    """ Rolling window of call durations for one function, in nanoseconds, recorded from any thread """
+
+    __slots__ = ('name', 'samples', 'calls', 'errors', 'total_ns', 'lock')
+
+    def __init__(self, name: str, window: int = SAMPLE_WINDOW):
+        self.name = name
+        self.samples = deque(maxlen=window)
+        self.calls = 0
+        self.errors = 0
+        self.total_ns = 0
+        self.lock = threading.Lock()  # Database methods are timed on the executor threads
+
+    def record(self, duration_ns: int, failed: bool = False):
+        with self.lock:
+            self.samples.append(duration_ns)
+            self.calls += 1
+            self.total_ns += duration_ns
+            if failed:
+                self.errors += 1
+
+    def reset(self):
+        with self.lock:
+            self.samples.clear()
+            self.calls = self.errors = self.total_ns = 0
+
+    def percentiles(self, *quantiles: float) -> list:
+        """ Nearest rank percentiles over the current window, in nanoseconds """
+        with self.lock:
+            ordered = sorted(self.samples)
+        if not ordered:
+            return [0 for _ in quantiles]
+        return [ordered[min(int(q * len(ordered)), len(ordered) - 1)] for q in quantiles]
+
+    def summary(self) -> dict:
+        p50, p95, p99 = self.percentiles(0.5, 0.95, 0.99)
+        with self.lock:
+            calls, errors, total_ns = self.calls, self.errors, self.total_ns
+        return {
+            'calls': calls,
+            'errors': errors,
+            'mean_ms': total_ns / calls / 1e6 if calls else 0.0,
+            'p50_ms': p50 / 1e6,
+            'p95_ms': p95 / 1e6,
+            'p99_ms': p99 / 1e6,
+        }
+
+
+class Profiler:
+    """
+        Registry of Profiles keyed by qualified function name, works on both sync
+        functions and coroutines (timed until the coroutine completes).
+        + Usage:
+            - @Profiler.timeit on a single function
+            - Profiler.instrument_class(MongoDatabase) to time every public method
+        Command latency is measured by utils.instrumentation, not here.
+    """
+
+    profiles = {}
+
+    @classmethod
+    def get(cls, name: str) -> Profile:
+        profile = cls.profiles.get(name)
+        if profile is None:
+            profile = cls.profiles.setdefault(name, Profile(name))
+        return profile
+
+    @classmethod
+    def timeit(cls, func, name: str = None):
+        if getattr(func, '__profiled__', False):
+            return func
+        profile = cls.get(name or func.__qualname__)
+
+        if inspect.iscoroutinefunction(func):
+            @functools.wraps(func)
+            async def wrapper(*args, **kwargs):
+                start, failed = time.perf_counter_ns(), False
+                try:
+                    return await func(*args, **kwargs)
+                except BaseException:
+                    failed = True
+                    raise
+                finally:
+                    profile.record(time.perf_counter_ns() - start, failed)
+        else:
+            @functools.wraps(func)
+            def wrapper(*args, **kwargs):
+                start, failed = time.perf_counter_ns(), False
+                try:
+                    return func(*args, **kwargs)
+                except BaseException:
+                    failed = True
+                    raise
+                finally:
+                    profile.record(time.perf_counter_ns() - start, failed)
+
+        wrapper.__profiled__ = True
+        return wrapper
+
+    @classmethod
+    def instrument_class(cls, klass):
+        """
+        Wraps every public method of the class, inherited ones included, in place.
+        Profiles are named module.Class.method, both bots' MongoDatabase classes stay apart.
+        """
+        prefix = f"{klass.__module__}.{klass.__name__}"
+        for name, member in inspect.getmembers(klass, inspect.isfunction):
+            if not name.startswith('_'):
+                setattr(klass, name, cls.timeit(member, name=f"{prefix}.{name}"))
+        return klass
+
+    @classmethod
+    def summaries(cls) -> dict:
+        return {name: profile.summary() for name, profile in list(cls.profiles.items())}
+
+    @classmethod
+    def reset(cls):
+        """ Cleared in place, wrapped functions keep a reference to their Profile """
+        for profile in list(cls.profiles.values()):
+            profile.reset()
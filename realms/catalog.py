@@ -0,0 +1,184 @@
+import json
+import mmap
+import os
+import struct
+import sys
+from collections import Counter
+
+CATALOG_PATH = r"resources/archieve/main_characters.json"
+CATALOG_BINARY_PATH = r"resources/archieve/main_characters.bin"
+
+# Binary catalog layout, little endian:
+#   header: magic, entry count
+#   offset table: per entry (name offset, name length, record offset, record length) into the pool
+#   string pool: utf-8 names followed by each entry's full record as compact json
+MAGIC = b"CRCAT\x00\x01\x00"
+HEADER = struct.Struct("<8sI")
+ENTRY = struct.Struct("<IIII")
+
+
+def trigrams(text: str) -> set:
+    """ Trigrams of the lower cased, space padded text, `ab` still gives `  a`, ` ab`, `ab ` """
+    padded = f"  {text.lower()} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def build_binary(json_path: str = CATALOG_PATH, binary_path: str = CATALOG_BINARY_PATH) -> int:
+    """ Converts the json catalog into the memory mappable format, returns the amount of entries """
+    with open(json_path, "r") as file:
+        characters = json.load(file)
+
+    pool, table = bytearray(), []
+    for character in characters:
+        name = character['name'].encode('utf-8')
+        record = json.dumps(character, separators=(',', ':')).encode('utf-8')
+        table.append((len(pool), len(name), len(pool) + len(name), len(record)))
+        pool += name + record
+
+    pool_start = HEADER.size + ENTRY.size * len(table)
+    tmp_path = binary_path + ".tmp"
+    with open(tmp_path, "wb") as file:
+        file.write(HEADER.pack(MAGIC, len(table)))
+        for name_off, name_len, record_off, record_len in table:
+            file.write(ENTRY.pack(pool_start + name_off, name_len, pool_start + record_off, record_len))
+        file.write(pool)
+    os.replace(tmp_path, binary_path)  # Processes that already mapped the old file keep reading it
+    return len(table)
+
+
+class MappedCharacters:
+    """
+        Read only sequence over a binary catalog, the file is memory mapped so every
+        cluster process shares the same pages and entries are only decoded when accessed.
+    """
+
+    def __init__(self, path: str = CATALOG_BINARY_PATH):
+        with open(path, "rb") as file:
+            self._map = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, self._count = HEADER.unpack_from(self._map, 0)
+        if magic != MAGIC:
+            raise ValueError(f"{path} is not a character catalog, rebuild it with `python -m realms.catalog`")
+
+    def _entry(self, index: int) -> tuple:
+        if index < 0:
+            index += self._count
+        if not 0 <= index < self._count:
+            raise IndexError("catalog index out of range")
+        return ENTRY.unpack_from(self._map, HEADER.size + ENTRY.size * index)
+
+    def name(self, index: int) -> str:
+        name_off, name_len, _, _ = self._entry(index)
+        return self._map[name_off:name_off + name_len].decode('utf-8')
+
+    def __getitem__(self, index: int) -> dict:
+        _, _, record_off, record_len = self._entry(index)
+        return json.loads(self._map[record_off:record_off + record_len])
+
+    def __len__(self):
+        return self._count
+
+
+class CharacterCatalog:
+    """
+        The reference list of every character that can be rolled, loaded once per process,
+        from the memory mapped binary catalog when it has been built and is up to date,
+        otherwise from the json. Characters are looked up by position (their catalog index),
+        by lower cased name in O(1) or fuzzily through a trigram index (built on first search)
+        that only scores characters sharing a trigram with the query.
+        + Usage:
+            - catalog = CharacterCatalog.load()
+            - catalog.find("Rem"), catalog.search("rem zer", limit=5), catalog[index]
+    """
+
+    _loaded = {}
+
+    def __init__(self, characters):
+        """
+        :param characters: List of character dicts or a MappedCharacters.
+        """
+        self.characters = characters
+        if isinstance(characters, MappedCharacters):
+            names = [characters.name(index) for index in range(len(characters))]
+        else:
+            names = [character['name'] for character in characters]
+
+        self.by_name = {}
+        for index, name in enumerate(names):
+            self.by_name.setdefault(name.lower(), index)
+        self._names = names
+        self.by_id = None
+        self.by_trigram = None
+        self._gram_counts = None
+
+    @classmethod
+    def load(cls, path: str = CATALOG_PATH, binary_path: str = CATALOG_BINARY_PATH) -> "CharacterCatalog":
+        catalog = cls._loaded.get(path)
+        if catalog is None:
+            if os.path.exists(binary_path) and \
+                    (not os.path.exists(path) or os.path.getmtime(binary_path) >= os.path.getmtime(path)):
+                catalog = cls(MappedCharacters(binary_path))
+            else:
+                with open(path, "r") as file:
+                    catalog = cls(json.load(file))
+            cls._loaded[path] = catalog
+        return catalog
+
+    def __len__(self):
+        return len(self.characters)
+
+    def __getitem__(self, index: int) -> dict:
+        return self.characters[index]
+
+    def find(self, name: str) -> [dict, None]:
+        """ Exact, case insensitive name lookup """
+        index = self.by_name.get(name.lower())
+        return self.characters[index] if index is not None else None
+
+    def get_by_id(self, _id) -> [dict, None]:
+        """ For entries carrying an `id`, the index is built on first use as it decodes every record """
+        if self.by_id is None:
+            self.by_id = {}
+            for index in range(len(self.characters)):
+                character = self.characters[index]
+                if 'id' in character:
+                    self.by_id.setdefault(character['id'], index)
+        index = self.by_id.get(_id)
+        return self.characters[index] if index is not None else None
+
+    def _build_trigrams(self):
+        by_trigram, gram_counts = {}, []
+        for index, name in enumerate(self._names):
+            grams = trigrams(name)
+            gram_counts.append(len(grams))
+            for gram in grams:
+                by_trigram.setdefault(gram, []).append(index)
+        self.by_trigram, self._gram_counts = by_trigram, gram_counts
+
+    def search(self, query: str, limit: int = 10, min_score: float = 0.3) -> list:
+        """
+        Characters whose names are closest to the query, best first, scored by
+        trigram overlap (Dice coefficient) so typos and partial names still match.
+        :returns [(score, character), ...]:
+        """
+        if self.by_trigram is None:
+            self._build_trigrams()
+        exact = self.by_name.get(query.lower())
+        query_grams = trigrams(query)
+        shared = Counter()
+        for gram in query_grams:
+            shared.update(self.by_trigram.get(gram, ()))
+
+        scored = []
+        for index, common in shared.items():
+            score = 1.0 if index == exact else 2 * common / (len(query_grams) + self._gram_counts[index])
+            if score >= min_score:
+                scored.append((score, index))
+        scored.sort(key=lambda item: item[0], reverse=True)
+        return [(score, self.characters[index]) for score, index in scored[:limit]]
+
+
+if __name__ == "__main__":
+    # python -m realms.catalog [json path] [binary path]
+    source = sys.argv[1] if len(sys.argv) > 1 else CATALOG_PATH
+    target = sys.argv[2] if len(sys.argv) > 2 else CATALOG_BINARY_PATH
+    print(f"Wrote {build_binary(source, target)} characters to {target}")
@@ -1,7 +1,7 @@
 import random
-import json
 import time
 
+from realms.catalog import CharacterCatalog
 from utils.id_maker import get_id
 
 BASE_HEARTS = 5
@@ -9,14 +9,17 @@ BASE_FOOD = 5
 BASE_TREATS = 5
 
 class CharacterRef:
-    with open(r"resources/archieve/main_characters.json", "r") as file:
-        references = json.load(file)
+    catalog = CharacterCatalog.load()
+    references = catalog.characters
 
     @classmethod
     def get_character(cls, name):
-        for character in cls.references:
-            if character['name'].lower() == name.lower():
-                return character
+        return cls.catalog.find(name)
+
+    @classmethod
+    def search_characters(cls, name, limit=10):
+        """ Closest matches for a partial or misspelt name, best first """
+        return [character for _, character in cls.catalog.search(name, limit=limit)]
 
 
 class Character:
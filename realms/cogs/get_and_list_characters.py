@@ -1,4 +1,3 @@
-import json
 import random
 import discord
 
@@ -6,11 +5,13 @@ from datetime import datetime
 from discord.ext import commands
 from discord.ext import tasks
 
+from realms.catalog import CharacterCatalog
+from realms.sampler import CharacterSampler, RARITY_WEIGHTS
 from realms.character import Character
 from realms.user_characters import UserCharacters
 from realms.static import Database
 
-from utils.paginator import Paginator
+from utils.paginator import Paginator, resolve_page
 
 NON_VOTE_ROLLS = 15
 VOTE_ROLLS_MOD = +15
@@ -38,10 +39,8 @@ def filter_(item_content):
 
 
 class CharacterGets(commands.Cog):
-    with open(r"resources/archieve/main_characters.json", "r") as file:
-        RANDOM_CHARACTERS = json.load(file)
-    random.shuffle(RANDOM_CHARACTERS)
-    group = RANDOM_CHARACTERS[:5000]
+    catalog = CharacterCatalog.load()
+    sampler = CharacterSampler.from_catalog(catalog, RARITY_WEIGHTS)
     database = Database.db
 
     def __init__(self, bot):
@@ -49,7 +48,13 @@ class CharacterGets(commands.Cog):
         self.cool_down_checks = {}
         self.pending = {}
         self.remove_null.start()
-        self.shuffle.start()
+        self.flush_task = self.bot.loop.create_task(self.database.write_buffer.background_task())
+
+    def cog_unload(self):
+        self.remove_null.cancel()
+        self.flush_task.cancel()
+        # Blocking bulk_write, kept off the event loop
+        self.bot.loop.create_task(Database.async_db.run(self.database.write_buffer.flush))
 
     def callback(self, user_id, user_characters: UserCharacters):
         self.cool_down_checks[user_id] = user_characters
@@ -68,11 +73,6 @@ class CharacterGets(commands.Cog):
         self.cool_down_checks = dict(
             filter(filter_, self.cool_down_checks.items()))
 
-    @tasks.loop(minutes=30)
-    async def shuffle(self):
-        random.shuffle(self.RANDOM_CHARACTERS)
-        self.group = self.RANDOM_CHARACTERS[:5000]
-
     @commands.command(aliases=['c'])
     async def character(self, ctx):
         user_characters: UserCharacters = self.bot.cache.get('characters', ctx.author.id)
@@ -81,19 +81,20 @@ class CharacterGets(commands.Cog):
             if user_characters is not None:
                 rolls, expires = user_characters.rolls_left, user_characters.expires_in
             else:
-                if ctx.has_voted(user_id=ctx.author.id):
+                if await ctx.has_voted(user_id=ctx.author.id):
                     rolls, expires = NON_VOTE_ROLLS + VOTE_ROLLS_MOD, None
                 else:
                     rolls, expires = NON_VOTE_ROLLS, None
-            user_characters = UserCharacters(user_id=ctx.author.id,
-                                             database=self.database,
-                                             rolls=rolls,
-                                             expires_in=expires,
-                                             callback=self.callback)
+            user_characters = await Database.async_db.run(UserCharacters,
+                                                          user_id=ctx.author.id,
+                                                          database=self.database,
+                                                          rolls=rolls,
+                                                          expires_in=expires,
+                                                          callback=self.callback)
             self.bot.cache.store('characters', ctx.author.id, user_characters)
 
         if not Checks.has_rolls(user_characters):
-            if not ctx.has_voted(user_id=ctx.author.id, force_db=True):
+            if not await ctx.has_voted(user_id=ctx.author.id, force_db=True):
                 return await ctx.send("<:HimeSad:676087829557936149> Oops! You dont have any more rolls left,"
                                       " upvote Crunchy to get more rolls and other awesome perks!\n"
                                       "https://top.gg/bot/656598065532239892/vote")
@@ -104,7 +105,7 @@ class CharacterGets(commands.Cog):
                 else:
                     user_characters.update_rolls(VOTE_ROLLS_MOD)
 
-        c = random.choice(self.group)
+        c = self.catalog[self.sampler.draw(user_id=ctx.author.id)]
         character_obj = Character(name=c['name'],
                                   icon=c['url'])
         embed = discord.Embed(
@@ -139,30 +140,33 @@ class CharacterGets(commands.Cog):
             for i, pending in enumerate(self.pending[payload.user_id]['messages']):
                 if pending['message_id'] == payload.message_id:
                     if str(payload.emoji) in RANDOM_EMOJIS:
-                        pending['user_character'].submit_character(pending['character'])
+                        await Database.async_db.run(pending['user_character'].submit_character,
+                                                    pending['character'])
                         await pending['channel'].send(
                             f"<:HimeHappy:677852789074034691> <@{pending['user'].id}> "
                             f"chose {pending['character'].name}! Good job!")
                         self.pending[payload.user_id]['messages'].pop(i)
                         break
 
+    def generate_page(self, user: discord.User, i: int, pages: int, chunk: list) -> discord.Embed:
+        embed = discord.Embed(color=self.bot.colour, timestamp=datetime.now()) \
+            .set_footer(text=f"Page {i + 1} / {pages}")
+        for x, item in enumerate(chunk):
+            embed.add_field(value=f"** {x + i * 5 + 1} ) - {item['name']} ( Level {item.get('level', 1)} )**",
+                            name="\u200b",
+                            inline=False)
+        embed.set_thumbnail(url=random.choice(HAPPY_URL))
+        embed.set_author(name=f"{user.name}'s collected characters", icon_url=user.avatar_url)
+        return embed
+
     async def generate_embeds(self, user: discord.User, area):
         pages, rem = divmod(area.amount_of_items, 5)
         if rem != 0:
             pages += 1
 
-        embeds = []
-        for i, chunk in enumerate(area.get_blocks()):
-            embed = discord.Embed(color=self.bot.colour, timestamp=datetime.now()) \
-                .set_footer(text=f"Page {i + 1} / {pages}")
-            for x, item in enumerate(chunk):
-                embed.add_field(value=f"** {x + i * 5 + 1} ) - {item['name']} ( Level {item.get('level', 1)} )**",
-                                name="\u200b",
-                                inline=False)
-            embed.set_thumbnail(url=random.choice(HAPPY_URL))
-            embed.set_author(name=f"{user.name}'s collected characters", icon_url=user.avatar_url)
-            embeds.append(embed)
-        return embeds
+        if area.paged:
+            return CharacterPages(self, user, area, pages)
+        return [self.generate_page(user, i, pages, chunk) for i, chunk in enumerate(area.get_blocks())]
 
     @commands.command(name="viewcharacters", aliases=['characters'])
     async def my_characters(self, ctx, user: discord.User = None):
@@ -172,15 +176,16 @@ class CharacterGets(commands.Cog):
             if user_characters is not None:
                 rolls = user_characters.rolls_left
             else:
-                if ctx.has_voted(user_id=ctx.author.id):
+                if await ctx.has_voted(user_id=ctx.author.id):
                     rolls = NON_VOTE_ROLLS + VOTE_ROLLS_MOD
                 else:
                     rolls = NON_VOTE_ROLLS
-            user_characters = UserCharacters(user_id=user.id,
-                                             database=self.database,
-                                             rolls=rolls,
-                                             expires_in=self.cool_down_checks.get('expires_in', None),
-                                             callback=self.callback)
+            user_characters = await Database.async_db.run(UserCharacters,
+                                                          user_id=user.id,
+                                                          database=self.database,
+                                                          rolls=rolls,
+                                                          expires_in=self.cool_down_checks.get('expires_in', None),
+                                                          callback=self.callback)
             self.bot.cache.store('characters', user.id, user_characters)
 
         else:
@@ -192,15 +197,16 @@ class CharacterGets(commands.Cog):
                     rolls = user_characters.rolls_left
                     expires = user_characters.expires_in
                 else:
-                    if ctx.has_voted(user_id=ctx.author.id):
+                    if await ctx.has_voted(user_id=ctx.author.id):
                         rolls, expires = NON_VOTE_ROLLS + VOTE_ROLLS_MOD, None
                     else:
                         rolls, expires = NON_VOTE_ROLLS, None
-                user_characters = UserCharacters(user_id=ctx.author.id,
-                                                 database=self.database,
-                                                 rolls=rolls,
-                                                 expires_in=expires,
-                                                 callback=self.callback)
+                user_characters = await Database.async_db.run(UserCharacters,
+                                                              user_id=ctx.author.id,
+                                                              database=self.database,
+                                                              rolls=rolls,
+                                                              expires_in=expires,
+                                                              callback=self.callback)
                 self.bot.cache.store('characters', ctx.author.id, user_characters)
 
         if user_characters.amount_of_items <= 0:
@@ -220,7 +226,7 @@ class CharacterGets(commands.Cog):
                                   colour=self.bot.colour)
                 return self.bot.loop.create_task(pager.start())
             else:
-                return await ctx.send(embed=embeds[0])
+                return await ctx.send(embed=await resolve_page(embeds[0]))
 
     async def cog_command_error(self, ctx, error):
         raise error
@@ -230,6 +236,33 @@ class CharacterGets(commands.Cog):
         cls.database.close_conn()
 
 
+class CharacterPages:
+    """
+        Embed list for the Paginator over per character documents, a page is
+        only queried the first time it's shown so large collections never load whole.
+    """
+
+    def __init__(self, cog: CharacterGets, user: discord.User, area: UserCharacters, pages: int):
+        self.cog = cog
+        self.user = user
+        self.area = area
+        self.pages = pages
+        self._embeds = {}
+
+    def __len__(self):
+        return self.pages
+
+    def __getitem__(self, i: int):
+        return self._load(i)
+
+    async def _load(self, i: int) -> discord.Embed:
+        embed = self._embeds.get(i)
+        if embed is None:
+            chunk = await Database.async_db.run(self.area.get_block, i)
+            embed = self._embeds[i] = self.cog.generate_page(self.user, i, self.pages, chunk)
+        return embed
+
+
 class Checks:
     @classmethod
     def has_rolls(cls, user: UserCharacters):
@@ -241,4 +274,5 @@ def setup(bot):
 
 
 def teardown(bot):
-    CharacterGets.shutdown()
+    # close_conn flushes and logs out, both block so it runs in the executor
+    bot.loop.create_task(Database.async_db.run(CharacterGets.shutdown))
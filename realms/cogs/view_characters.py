@@ -32,8 +32,8 @@ class ViewCharacters(commands.Cog):
             await ctx.send("<:HimeSad:676087829557936149> You didnt give me anyone to get. Check your list here:")
             return await command.invoke(ctx)
 
-        user_area = UserCharacters(user_id=ctx.author.id, database=self.database)
-        character_dict = user_area.get_character(search=character_name)
+        user_area = await Database.async_db.run(UserCharacters, user_id=ctx.author.id, database=self.database)
+        character_dict = await Database.async_db.run(user_area.get_character, search=character_name)
         if character_dict is None:
             return await ctx.send("<:HimeSad:676087829557936149> Sorry! >_< I couldn't find that character "
                                   "in your area, Time to get rolling and collecting more!")
@@ -41,7 +41,9 @@ class ViewCharacters(commands.Cog):
         character = Character().from_dict(character_dict)
         details = Display(self.bot, character, ctx)
         await ctx.send(embed=details.generate_pages())
-        user_area.update_character(character)
+        # Only written back when loading filled in fields the stored character was missing
+        if character.to_dict() != character_dict:
+            await Database.async_db.run(user_area.update_character, character)
 
     async def cog_command_error(self, ctx, error):
         raise error
@@ -1,6 +1,9 @@
 import json
+import re
 import pymongo
 
+from data.helpers import upsert, stamped
+from data.write_buffer import WriteBuffer
 from realms.datastores.events_db import EventsStore
 
 
@@ -17,6 +20,13 @@ class MongoDatabase(EventsStore):
     with open(r'database_config.json', 'r') as file:
         config = json.load(file)
 
+    # 'array' keeps every character in the user's `characters` array, 'documents' stores
+    # one document per character in `owned_characters`, see realms/datastores/migrate_characters.py
+    CHARACTER_STORAGE = config.get('character_storage', 'array')
+
+    # Internal fields of a character document, stripped before it's handed back as a character dict
+    CHARACTER_PROJECTION = {'_id': 0, 'user_id': 0, 'name_lower': 0, 'updated_at': 0}
+
     def __init__(self):
         """
         This method requires no parameters, It takes all data from the
@@ -42,14 +52,20 @@ class MongoDatabase(EventsStore):
 
         self.db = self.client["Crunchy"]
         self.characters = self.db["collected_characters"]
+        self.owned_characters = self.db["owned_characters"]
         self.parties = self.db["parties"]
+        if self.per_character_storage:
+            self.create_character_indexes()
+        self.write_buffer = WriteBuffer({'characters': self.characters})
         super().__init__(self.db)
 
     def close_conn(self):
-        """ Logs us out of the data """
+        """ Flushes any buffered writes and logs us out of the data """
+        self.write_buffer.flush()
         self.db.logout()
 
     def get_characters(self, user_id: int):
+        self.write_buffer.flush_key('characters', user_id)
         resp = self.characters.find_one({'_id': user_id})
         return resp if resp is not None else {
             '_id': user_id,
@@ -57,30 +73,81 @@ class MongoDatabase(EventsStore):
             'rank': {'ranking': 0, 'power': 0, 'total_character': 0}
         }
 
+    def has_characters(self, user_id: int) -> bool:
+        self.write_buffer.flush_key('characters', user_id)
+        return self.characters.find_one({'_id': user_id}, {'_id': 1}) is not None
+
     def update_any(self, user_id: int, **kwargs):
-        if self.characters.find_one({'_id': user_id}) is not None:
-            return self.characters.find_one_and_update({'_id': user_id}, {'$set': kwargs})
-        else:
-            return self.characters.insert_one({'_id': user_id}, **kwargs)
+        self.write_buffer.queue('characters', user_id, {'$set': kwargs})
 
     def update_characters(self, user_id: int, characters: list):
-        return self.characters.find_one_and_update({'_id': user_id}, {'$set': {'characters': characters}})
+        self.write_buffer.queue('characters', user_id, {'$set': {'characters': characters}}, upsert=False)
 
     def add_characters(self, user_id: int, data: dict):
-        self.characters.insert_one({'_id': user_id, **data})
+        self.write_buffer.flush_key('characters', user_id)
+        # Upserted rather than inserted so it carries the same `updated_at` stamp as every other write
+        self.characters.update_one({'_id': user_id}, stamped({'$setOnInsert': data}), upsert=True)
 
     def update_rank(self, user_id: int, rank: dict):
-        return self.characters.find_one_and_update({'_id': user_id}, {'$set': {'rank': rank}})
+        self.write_buffer.queue('characters', user_id, {'$set': {'rank': rank}}, upsert=False)
 
     def reset_characters(self, user_id: int):
+        self.write_buffer.flush_key('characters', user_id)
+        if self.per_character_storage:
+            self.owned_characters.delete_many({'user_id': user_id})
         return self.characters.find_one_and_delete({'_id': user_id})
 
+    # Per character documents area, only used when CHARACTER_STORAGE is 'documents'
+    @property
+    def per_character_storage(self) -> bool:
+        return self.CHARACTER_STORAGE == 'documents'
+
+    def create_character_indexes(self):
+        self.owned_characters.create_index([('user_id', pymongo.ASCENDING), ('id', pymongo.ASCENDING)], unique=True)
+        self.owned_characters.create_index([('user_id', pymongo.ASCENDING), ('name_lower', pymongo.ASCENDING)])
+        # ObjectIds grow with insertion, so this keeps a user's pages in the order they were collected
+        self.owned_characters.create_index([('user_id', pymongo.ASCENDING), ('_id', pymongo.ASCENDING)])
+
+    @staticmethod
+    def character_document(user_id: int, character: dict) -> dict:
+        return {**character, 'user_id': user_id, 'name_lower': character['name'].lower()}
+
+    def count_characters(self, user_id: int) -> int:
+        return self.owned_characters.count_documents({'user_id': user_id})
+
+    def get_character_page(self, user_id: int, page: int, per_page: int = 5) -> list:
+        cursor = self.owned_characters.find({'user_id': user_id}, self.CHARACTER_PROJECTION) \
+            .sort('_id', pymongo.ASCENDING).skip(page * per_page).limit(per_page)
+        return list(cursor)
+
+    def find_character(self, user_id: int, id_: int = None, name: str = None) -> [dict, None]:
+        """ By id, or by name where an exact match wins over the earliest character containing it """
+        if id_ is not None:
+            return self.owned_characters.find_one({'user_id': user_id, 'id': id_}, self.CHARACTER_PROJECTION)
+        name = name.lower()
+        character = self.owned_characters.find_one({'user_id': user_id, 'name_lower': name},
+                                                   self.CHARACTER_PROJECTION, sort=[('_id', pymongo.ASCENDING)])
+        if character is None:
+            character = self.owned_characters.find_one(
+                {'user_id': user_id, 'name_lower': {'$regex': re.escape(name)}},
+                self.CHARACTER_PROJECTION, sort=[('_id', pymongo.ASCENDING)])
+        return character
+
+    def add_character(self, user_id: int, character: dict):
+        self.owned_characters.update_one({'user_id': user_id, 'id': character['id']},
+                                         stamped({'$setOnInsert': self.character_document(user_id, character)}),
+                                         upsert=True)
+
+    def update_character(self, user_id: int, character: dict):
+        self.owned_characters.update_one({'user_id': user_id, 'id': character['id']},
+                                         stamped({'$set': self.character_document(user_id, character)}))
+
+    def remove_character(self, user_id: int, id_: int) -> bool:
+        return self.owned_characters.delete_one({'user_id': user_id, 'id': id_}).deleted_count > 0
+
     # Parties area
     def update_any_party(self, user_id: int, **kwargs):
-        if self.parties.find_one({'_id': user_id}) is not None:
-            return self.parties.find_one_and_update({'_id': user_id}, {'$set': kwargs})
-        else:
-            return self.parties.insert_one({'_id': user_id, **kwargs})
+        return upsert(self.parties, user_id, kwargs)
 
     def get_party(self, user_id: int):
         return self.parties.find_one({'_id': user_id})
@@ -0,0 +1,54 @@
+import sys
+
+from bson import ObjectId
+from pymongo import UpdateOne
+
+from data.helpers import stamped
+from realms.datastores.database import MongoDatabase
+
+
+def migrate_user(database: MongoDatabase, user_id: int, characters: list, keep_array: bool = False) -> int:
+    """
+    Copies one user's `characters` array into per character documents, then drops the array.
+    Safe to re-run, characters that already have a document are left untouched.
+    :returns the amount of characters copied:
+    """
+    if characters:
+        # Client side ObjectIds keep the array order, pages are sorted on _id
+        requests = [UpdateOne({'user_id': user_id, 'id': character['id']},
+                              stamped({'$setOnInsert': {'_id': ObjectId(),
+                                                        **database.character_document(user_id, character)}}),
+                              upsert=True)
+                    for character in characters]
+        database.owned_characters.bulk_write(requests, ordered=True)
+    if not keep_array:
+        database.characters.update_one({'_id': user_id}, stamped({'$unset': {'characters': ""}}))
+    return len(characters)
+
+
+def migrate(database: MongoDatabase, keep_array: bool = False, log=print) -> (int, int):
+    """
+    Moves every user from the array layout to per character documents, run it while the bot is
+    stopped (or still on 'array' storage) and switch `character_storage` to 'documents' afterwards.
+    :param keep_array: Leave the arrays in place, e.g. for a dry run that can be rolled back.
+    :returns (users, characters) migrated:
+    """
+    database.write_buffer.flush()
+    database.create_character_indexes()
+
+    users = characters = 0
+    cursor = database.characters.find({'characters': {'$exists': True}}, {'characters': 1})
+    for document in cursor:
+        characters += migrate_user(database, document['_id'], document['characters'], keep_array=keep_array)
+        users += 1
+        if users % 1000 == 0:
+            log(f"Migrated {users} users, {characters} characters")
+    return users, characters
+
+
+if __name__ == "__main__":
+    # python -m realms.datastores.migrate_characters [--keep-array]
+    db = MongoDatabase()
+    migrated_users, migrated_characters = migrate(db, keep_array='--keep-array' in sys.argv[1:])
+    print(f"Migrated {migrated_users} users, {migrated_characters} characters to `owned_characters`")
+    db.close_conn()
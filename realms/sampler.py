@@ -0,0 +1,102 @@
+import random
+from array import array
+from collections import OrderedDict, deque
+
+# Relative odds of each rarity tier, characters without a `rarity` count as common
+RARITY_WEIGHTS = {
+    'common': 100,
+    'uncommon': 40,
+    'rare': 10,
+    'epic': 3,
+    'legendary': 1,
+}
+
+
+class AliasTable:
+    """
+        Vose's alias method, O(n) to build and O(1) per draw for any set of weights:
+        pick a column uniformly, then keep it or take its alias with the column's probability.
+    """
+
+    def __init__(self, weights):
+        count = len(weights)
+        if count == 0:
+            raise ValueError("can't sample from an empty set of weights")
+        total = float(sum(weights))
+        scaled = [weight * count / total for weight in weights]
+        self.probability = array('d', [1.0]) * count
+        self.alias = array('I', range(count))
+
+        small = [i for i, value in enumerate(scaled) if value < 1.0]
+        large = [i for i, value in enumerate(scaled) if value >= 1.0]
+        while small and large:
+            less, more = small.pop(), large.pop()
+            self.probability[less] = scaled[less]
+            self.alias[less] = more
+            scaled[more] -= 1.0 - scaled[less]
+            (small if scaled[more] < 1.0 else large).append(more)
+        # Whatever is left is 1.0 give or take float error, probability and alias are already right
+
+    def draw(self, rng=random) -> int:
+        column = int(rng.random() * len(self.probability))
+        return column if rng.random() < self.probability[column] else self.alias[column]
+
+    def __len__(self):
+        return len(self.probability)
+
+
+class CharacterSampler:
+    """
+        Draws catalog indexes in O(1) weighted by rarity tier, and avoids handing a user
+        one of the last `recent` characters they rolled by redrawing a few times.
+    """
+
+    def __init__(self, weights, recent: int = 50, retries: int = 5, max_users: int = 10_000):
+        """
+        :param weights: Relative weight of every catalog index.
+        :param recent: Amount of a user's last rolls that are suppressed.
+        :param retries: Redraws before a duplicate is allowed through, keeps draws O(1).
+        :param max_users: Users whose recent rolls are remembered, least recently rolling are dropped.
+        """
+        self.table = AliasTable(weights)
+        self.recent = min(recent, len(self.table) - 1)
+        self.retries = retries
+        self.max_users = max_users
+        self._history = OrderedDict()  # user_id -> (deque of recent indexes, set of the same)
+
+    @classmethod
+    def from_catalog(cls, catalog, tier_weights: dict = None, **kwargs) -> "CharacterSampler":
+        """ Uniform when tier_weights is None, otherwise weights every character by its `rarity` """
+        if tier_weights is None:
+            return cls([1] * len(catalog), **kwargs)
+        default = tier_weights.get('common', 1)
+        return cls([tier_weights.get(catalog[index].get('rarity'), default) for index in range(len(catalog))],
+                   **kwargs)
+
+    def _recent_of(self, user_id):
+        history = self._history.get(user_id)
+        if history is None:
+            history = self._history[user_id] = (deque(), set())
+            if len(self._history) > self.max_users:
+                self._history.popitem(last=False)
+        else:
+            self._history.move_to_end(user_id)
+        return history
+
+    def draw(self, user_id=None) -> int:
+        index = self.table.draw()
+        if user_id is None or self.recent <= 0:
+            return index
+
+        order, seen = self._recent_of(user_id)
+        for _ in range(self.retries):
+            if index not in seen:
+                break
+            index = self.table.draw()
+
+        if index not in seen:
+            order.append(index)
+            seen.add(index)
+            if len(order) > self.recent:
+                seen.discard(order.popleft())
+        return index
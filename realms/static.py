@@ -1,5 +1,7 @@
 from datetime import timedelta
 
+from data.async_database import AsyncDatabase
+from profiler import Profiler
 from realms.datastores.database import MongoDatabase
 from realms.datastores.cachemanager import CacheManager, Store
 
@@ -11,8 +13,12 @@ REQUIRED_CACHE = [
 ]
 
 
+Profiler.instrument_class(MongoDatabase)
+
+
 class Database:
     db = MongoDatabase()
+    async_db = AsyncDatabase(db)
     cache = CacheManager()
     for collection in REQUIRED_CACHE:
         cache.add_cache_store(Store(name=collection[0], max_time=collection[1]))
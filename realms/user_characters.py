@@ -1,15 +1,112 @@
 from datetime import datetime, timedelta
 
+from realms.catalog import trigrams
 from realms.character import Character
 from realms.datastores.database import MongoDatabase
 
 
+class CharacterIndex:
+    """
+        Lookups over a user's characters list without scanning it, positions by id,
+        positions by lower cased name and a trigram index narrowing substring searches,
+        the trigram index is only built by the first substring search as most loads never need it.
+        Every mutation of the list has to go through add / replace / remove to stay in sync.
+    """
+
+    def __init__(self, characters: list):
+        self.characters = characters
+        self.by_id = {}
+        self.by_name = {}
+        self.by_trigram = None
+        for position, character in enumerate(characters):
+            self._index(position, character)
+
+    def _build_trigrams(self):
+        self.by_trigram = {}
+        for position, character in enumerate(self.characters):
+            for gram in trigrams(character['name'].lower()):
+                self.by_trigram.setdefault(gram, set()).add(position)
+
+    def _index(self, position: int, character: dict):
+        name = character['name'].lower()
+        self.by_id[character['id']] = position
+        self.by_name.setdefault(name, []).append(position)
+        if self.by_trigram is not None:
+            for gram in trigrams(name):
+                self.by_trigram.setdefault(gram, set()).add(position)
+
+    def _unindex(self, position: int, character: dict):
+        name = character['name'].lower()
+        self.by_id.pop(character['id'], None)
+        positions = self.by_name.get(name, [])
+        if position in positions:
+            positions.remove(position)
+            if not positions:
+                del self.by_name[name]
+        if self.by_trigram is not None:
+            for gram in trigrams(name):
+                self.by_trigram.get(gram, set()).discard(position)
+
+    def add(self, character: dict):
+        self.characters.append(character)
+        self._index(len(self.characters) - 1, character)
+
+    def replace(self, character: dict) -> bool:
+        position = self.by_id.get(character['id'])
+        if position is None:
+            return False
+        self._unindex(position, self.characters[position])
+        self.characters[position] = character
+        self._index(position, character)
+        return True
+
+    def remove(self, id_) -> bool:
+        position = self.by_id.get(id_)
+        if position is None:
+            return False
+        self._unindex(position, self.characters.pop(position))
+        # Only the characters after the removed slot moved, each one down by one
+        for new_position in range(position, len(self.characters)):
+            character = self.characters[new_position]
+            self.by_id[character['id']] = new_position
+            positions = self.by_name[character['name'].lower()]
+            positions[positions.index(new_position + 1)] = new_position
+        self.by_trigram = None  # Rebuilt by the next substring search rather than shifted here
+        return True
+
+    def find_id(self, id_) -> [dict, None]:
+        position = self.by_id.get(id_)
+        return self.characters[position] if position is not None else None
+
+    def find_name(self, name: str) -> [dict, None]:
+        """ Exact name first, otherwise the earliest character whose name contains it """
+        name = name.lower()
+        positions = self.by_name.get(name)
+        if positions:
+            return self.characters[positions[0]]
+
+        if len(name) < 3:  # Too short to have a trigram, only these scan
+            candidates = range(len(self.characters))
+        else:
+            if self.by_trigram is None:
+                self._build_trigrams()
+            postings = [self.by_trigram.get(name[i:i + 3], set()) for i in range(len(name) - 2)]
+            candidates = sorted(set.intersection(*sorted(postings, key=len)))
+        for position in candidates:
+            if name in self.characters[position]['name'].lower():
+                return self.characters[position]
+        return None
+
+
 class UserCharacters:
     """
         Object representing a user's characters, this system can
         be modified to expand to fit anything that is needed which
         will likely be the case as this system is developed.
         This also handles all DB interactions and self contains it.
+        With per character storage (database.per_character_storage) the
+        characters are never loaded as a whole, lookups, edits and pages
+        all go to their own documents.
         :returns UserCharacters object:
     """
 
@@ -25,31 +122,48 @@ class UserCharacters:
         self.user_id = user_id
         self._db: MongoDatabase = database
         data = self._db.get_characters(user_id=user_id)
+        self._documents = self._db.per_character_storage
 
-        self.characters = data.pop('characters', [])  # Emergency safe guard
+        self.characters = [] if self._documents else data.pop('characters', [])  # Emergency safe guard
+        self._index = CharacterIndex(self.characters)
+        self._count = self._db.count_characters(user_id) if self._documents else None
         self.rank = data.pop('rank', {'ranking': 0, 'power': 0, 'total_character': 0})
         self.bank = data.pop('balance', {'copper': 50, 'gold': 10, 'platinum': 0})
         self._rolls = rolls
         self._expires_in = data.pop('expires_in', expires_in)
         self.mod_callback = callback
 
+    def _fields(self) -> dict:
+        """ The user document's fields, the characters array only exists in the array layout """
+        if self._documents:
+            return {'rank': self.rank, 'balance': self.bank}
+        return {'characters': self.characters, 'rank': self.rank, 'balance': self.bank}
+
     def update_on_db(self):
-        self._db.update_any(self.user_id, characters=self.characters, rank=self.rank, balance=self.bank)
+        self._db.update_any(self.user_id, **self._fields())
 
     def submit_character(self, character: Character):
-        if self._db.characters.find_one({'_id': self.user_id}) is not None:
-            self.characters.append(character.to_dict())
+        if self._documents:
+            if not self._db.has_characters(self.user_id):
+                self._db.add_characters(self.user_id, self._fields())
+            self._db.add_character(self.user_id, character.to_dict())
+            self._count += 1
+        elif self._db.has_characters(self.user_id):
+            self._index.add(character.to_dict())
             self._db.update_characters(self.user_id, self.characters)
         else:
-            self.characters.append(character.to_dict())
-            self._db.add_characters(self.user_id,
-                                    {'characters': self.characters, 'rank': self.rank, 'balance': self.bank})
+            self._index.add(character.to_dict())
+            self._db.add_characters(self.user_id, self._fields())
 
     def dump_character(self, character: Character):
-        id_ = character.id
-        for i, character_ in enumerate(self.characters):
-            if character_['id'] == id_:
-                self.characters.pop(i)
+        if self._documents:
+            if self._db.remove_character(self.user_id, character.id):
+                self._count -= 1
+            if self._count <= 0:
+                self._db.reset_characters(user_id=self.user_id)
+            return self.characters
+
+        self._index.remove(character.id)
         if len(self.characters) > 0:
             self._db.update_characters(self.user_id, self.characters)
         else:
@@ -57,23 +171,20 @@ class UserCharacters:
         return self.characters
 
     def get_character(self, search: str=None, id_: int=None) -> [dict, None]:
-        for character in self.characters:
-            if search is not None:
-                if character['name'].lower() == search.lower():
-                    return character
-            elif id_ is not None:
-                if character['id'] == id_:
-                    return character
+        if self._documents:
+            return self._db.find_character(self.user_id, id_=id_, name=search) \
+                if search is not None or id_ is not None else None
         if search is not None:
-            for character in self.characters:
-                if search.lower() in character['name'].lower():
-                    return character
+            return self._index.find_name(search)
+        if id_ is not None:
+            return self._index.find_id(id_)
         return None
 
     def update_character(self, character: Character) -> Character:
-        for i, char in enumerate(self.characters):
-            if character.id == char['id']:
-                self.characters[i] = character.to_dict()
+        if self._documents:
+            self._db.update_character(self.user_id, character.to_dict())
+            return character
+        self._index.replace(character.to_dict())
         self._db.update_characters(self.user_id, self.characters)
         return character
 
@@ -102,20 +213,30 @@ class UserCharacters:
                 return self._expires_in
         return self._expires_in
 
+    @property
+    def paged(self) -> bool:
+        """ True when blocks come from the database, fetch them with get_block off the event loop """
+        return self._documents
+
+    def get_block(self, page: int, per_page: int = 5) -> list:
+        if self._documents:
+            return self._db.get_character_page(self.user_id, page, per_page)
+        return self.characters[page * per_page:(page + 1) * per_page]
+
     def get_blocks(self):
         """ A generator to allow the bot to paginate large sets. """
-        for i in range(0, len(self.characters), 5):
-            yield self.characters[i:i + 5]
+        for i in range(0, self.amount_of_items, 5):
+            yield self.get_block(i // 5)
 
     @property
     def amount_of_items(self):
-        return len(self.characters)
+        return self._count if self._documents else len(self.characters)
 
     def update_balance(self, platinum=0, gold=0, copper=0):
         self.bank['platinum'] += platinum
         self.bank['gold'] += gold
         self.bank['copper'] += copper
-        self._db.update_any(self.user_id, characters=self.characters, rank=self.rank, balance=self.bank)
+        self._db.update_any(self.user_id, **self._fields())
         return self.bank
 
     @property
@@ -0,0 +1,43 @@
+import asyncio
+import unittest
+
+from data.cachemanager import CacheManager, Store
+
+
+class TestGetOrLoad(unittest.TestCase):
+    def setUp(self):
+        self.cache = CacheManager()
+        self.cache.add_cache_store(Store(name='guilds'))
+
+    @staticmethod
+    async def slow_loader():
+        await asyncio.sleep(0.05)
+        return 'before the change'
+
+    def test_invalidated_load_is_not_cached(self):
+        async def run():
+            load = asyncio.ensure_future(self.cache.get_or_load('guilds', 1, self.slow_loader))
+            await asyncio.sleep(0.01)
+            self.cache.invalidate('guilds', 1)
+            return await load
+
+        self.assertEqual(asyncio.run(run()), 'before the change')
+        self.assertIsNone(self.cache.get('guilds', 1))
+
+    def test_uninterrupted_load_is_cached(self):
+        asyncio.run(self.cache.get_or_load('guilds', 1, self.slow_loader))
+        self.assertEqual(self.cache.get('guilds', 1), 'before the change')
+
+    def test_load_finishing_after_the_store_is_removed(self):
+        async def run():
+            load = asyncio.ensure_future(self.cache.get_or_load('guilds', 1, self.slow_loader))
+            await asyncio.sleep(0.01)
+            self.cache.remove_cache_store('guilds')
+            return await load
+
+        self.assertEqual(asyncio.run(run()), 'before the change')
+        self.assertNotIn('guilds', self.cache.collections)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,51 @@
+import unittest
+
+from pymongo.errors import BulkWriteError
+
+from data.write_buffer import WriteBuffer
+
+
+class FailingCollection:
+    """ Applies ordered bulk writes to a dict, every op on `bad_id` fails like a validation error would """
+
+    def __init__(self, bad_id):
+        self.bad_id = bad_id
+        self.applied = []
+
+    def bulk_write(self, requests, ordered=True):
+        for index, request in enumerate(requests):
+            _id = request._filter['_id']
+            if _id == self.bad_id:
+                raise BulkWriteError({'writeErrors': [{'index': index, 'errmsg': 'Document failed validation'}]})
+            self.applied.append(_id)
+        return type('Result', (), {'modified_count': len(requests)})()
+
+
+class TestWriteBuffer(unittest.TestCase):
+    def test_failed_op_is_dropped_not_retried(self):
+        collection = FailingCollection(bad_id=2)
+        buffer = WriteBuffer({'area': collection})
+        for _id in (1, 2, 3):
+            buffer.queue('area', _id, {'$set': {'value': _id}})
+
+        buffer.flush()
+        self.assertEqual(collection.applied, [1, 3])
+        self.assertEqual(buffer.pending, 0)
+
+        for _id in (10, 11):
+            buffer.queue('area', _id, {'$set': {'value': _id}})
+        buffer.flush()
+        self.assertEqual(collection.applied, [1, 3, 10, 11])
+        self.assertEqual(buffer.pending, 0)
+
+    def test_flush_key_keeps_the_key_readable(self):
+        collection = FailingCollection(bad_id=2)
+        buffer = WriteBuffer({'area': collection})
+        buffer.queue('area', 2, {'$set': {'value': 1}})
+        buffer.flush_key('area', 2)
+        buffer.flush_key('area', 2)
+        self.assertEqual(buffer.pending, 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
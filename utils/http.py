@@ -0,0 +1,14 @@
+import aiohttp
+
+TIMEOUT = aiohttp.ClientTimeout(total=20, connect=5, sock_read=15)
+
+
+def create_session(**kwargs) -> aiohttp.ClientSession:
+    """
+    The bot's one outbound HTTP session, connections are kept alive and reused
+    across commands, capped per host, and DNS lookups are cached for 5 minutes.
+    Must be called from inside the running loop.
+    """
+    connector = aiohttp.TCPConnector(limit=100, limit_per_host=20, ttl_dns_cache=300,
+                                     keepalive_timeout=30, enable_cleanup_closed=True)
+    return aiohttp.ClientSession(connector=connector, timeout=TIMEOUT, **kwargs)
@@ -0,0 +1,160 @@
+import asyncio
+import bisect
+import time
+
+from aiohttp import web
+
+from logger import Logger
+
+# Upper bounds in seconds, the same defaults the Prometheus client libraries use
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.075, 0.1, 0.25, 0.5, 0.75, 1.0, 2.5, 5.0, 7.5, 10.0, float('inf'))
+
+
+class Histogram:
+    """ Cumulative bucket histogram, cheap enough to observe on every command """
+
+    def __init__(self, buckets=BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value: float):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.sum += value
+
+    def quantile(self, q: float) -> float:
+        """ Approximate quantile, the upper bound of the bucket the q-th observation fell in """
+        if not self.count:
+            return 0.0
+        target, seen = q * self.count, 0
+        for bound, count in zip(self.buckets, self.counts):
+            seen += count
+            if seen >= target:
+                return bound
+        return self.buckets[-1]
+
+    def prometheus(self, name: str, labels: str = "") -> list:
+        sep = "," if labels else ""
+        lines, cumulative = [], 0
+        for bound, count in zip(self.buckets, self.counts):
+            cumulative += count
+            le = "+Inf" if bound == float('inf') else repr(bound)
+            lines.append(f'{name}_bucket{{{labels}{sep}le="{le}"}} {cumulative}')
+        lines.append(f"{name}_sum{{{labels}}} {self.sum}")
+        lines.append(f"{name}_count{{{labels}}} {self.count}")
+        return lines
+
+
+class Instrumentation:
+    """
+        Runtime numbers for one bot process: event loop lag, per command latency,
+        gateway latency per shard, executor backlog and cache / write buffer state.
+        Read through the owner `perf` command or as Prometheus text from `/metrics`.
+    """
+
+    LAG_WARNING = 0.5  # Seconds of loop lag that get logged
+
+    def __init__(self, bot, executor=None, lag_interval: float = 0.5):
+        """
+        :param bot: The CrunchyBot being measured.
+        :param executor: -> Optional
+        The ThreadPoolExecutor blocking calls run on, its queue depth is reported.
+        :param lag_interval: Seconds between loop lag probes.
+        """
+        self.bot = bot
+        self.executor = executor
+        self.lag_interval = lag_interval
+        self.loop_lag = Histogram()
+        self.last_lag = 0.0
+        self.max_lag = 0.0
+        self.commands = {}
+        self.command_errors = {}
+        self._server = None
+
+    async def monitor_loop(self):
+        """ Sleeps for lag_interval and measures how late the loop woke us up """
+        loop = asyncio.get_event_loop()
+        while True:
+            start = loop.time()
+            await asyncio.sleep(self.lag_interval)
+            lag = max(loop.time() - start - self.lag_interval, 0.0)
+            self.loop_lag.observe(lag)
+            self.last_lag = lag
+            self.max_lag = max(self.max_lag, lag)
+            if lag >= self.LAG_WARNING:
+                Logger.log_info(f"Event loop blocked for {lag * 1000:.0f}ms", error=True)
+
+    def command_started(self, ctx):
+        setattr(ctx, 'started_at', time.perf_counter())
+
+    async def command_finished(self, ctx):
+        """ Registered as the bot's after_invoke hook """
+        started = getattr(ctx, 'started_at', None)
+        if started is None or ctx.command is None:
+            return
+        name = ctx.command.qualified_name
+        histogram = self.commands.get(name)
+        if histogram is None:
+            histogram = self.commands[name] = Histogram()
+        histogram.observe(time.perf_counter() - started)
+        if ctx.command_failed:
+            self.command_errors[name] = self.command_errors.get(name, 0) + 1
+
+    def executor_queue_depth(self) -> int:
+        queue = getattr(self.executor, '_work_queue', None)
+        return queue.qsize() if queue is not None else 0
+
+    def shard_latencies(self) -> list:
+        return [(shard_id, latency) for shard_id, latency in self.bot.latencies]
+
+    @staticmethod
+    def _family(name: str, kind: str, help_text: str, samples: list) -> list:
+        """ One metric family, its HELP / TYPE header followed by every one of its samples """
+        return [f"# HELP {name} {help_text}", f"# TYPE {name} {kind}"] + samples
+
+    def prometheus(self) -> str:
+        cluster = f'cluster="{self.bot.cluster_id}"'
+        lines = self._family("crunchy_loop_lag_seconds", "histogram", "How late the event loop ran a timer.",
+                             self.loop_lag.prometheus("crunchy_loop_lag_seconds", cluster))
+
+        command_samples = []
+        for name, histogram in self.commands.items():
+            command_samples += histogram.prometheus("crunchy_command_seconds", f'{cluster},command="{name}"')
+        lines += self._family("crunchy_command_seconds", "histogram", "Command latency.", command_samples)
+        lines += self._family("crunchy_command_errors_total", "counter", "Commands that raised.", [
+            f'crunchy_command_errors_total{{{cluster},command="{name}"}} {errors}'
+            for name, errors in self.command_errors.items()])
+
+        lines += self._family("crunchy_gateway_latency_seconds", "gauge", "Heartbeat latency per shard.", [
+            f'crunchy_gateway_latency_seconds{{{cluster},shard="{shard_id}"}} {latency}'
+            for shard_id, latency in self.shard_latencies()])
+        lines += self._family("crunchy_executor_queue_depth", "gauge", "Blocking calls waiting for a thread.", [
+            f"crunchy_executor_queue_depth{{{cluster}}} {self.executor_queue_depth()}"])
+        lines += self._family("crunchy_write_buffer_pending", "gauge", "Keys with buffered writes.", [
+            f"crunchy_write_buffer_pending{{{cluster}}} {self.bot.database.write_buffer.pending}"])
+
+        cache = self.bot.cache.stats()
+        lines += self._family("crunchy_cache_entries", "gauge", "Entries per cache store.", [
+            f'crunchy_cache_entries{{{cluster},store="{store}"}} {stats["entries"]}'
+            for store, stats in cache.items()])
+        for counter in ('hits', 'negative_hits', 'misses', 'evictions'):
+            lines += self._family(f"crunchy_cache_{counter}_total", "counter",
+                                  f"Cache {counter.replace('_', ' ')} per store.", [
+                                      f'crunchy_cache_{counter}_total{{{cluster},store="{store}"}} {stats[counter]}'
+                                      for store, stats in cache.items()])
+        return "\n".join(lines) + "\n"
+
+    async def _metrics(self, request):
+        return web.Response(text=self.prometheus(), content_type="text/plain")
+
+    async def start_server(self, host: str = "127.0.0.1", port: int = 9100):
+        """ Serves the Prometheus text format on http://host:port/metrics """
+        app = web.Application()
+        app.router.add_get("/metrics", self._metrics)
+        runner = web.AppRunner(app)
+        await runner.setup()
+        self._server = web.TCPSite(runner, host, port)
+        await self._server.start()
+        Logger.log_info(f"Serving metrics on http://{host}:{port}/metrics")
@@ -1,5 +1,11 @@
 import discord
 import asyncio
+import inspect
+
+
+async def resolve_page(page) -> discord.Embed:
+    """ Pages can be embeds or awaitables of one, for lists that only build a page once it's shown """
+    return await page if inspect.isawaitable(page) else page
 
 
 class Paginator:
@@ -22,7 +28,7 @@ class Paginator:
 
     async def start(self):
         try:
-            self.old_message = await self.channel.send(embed=self.embed_list[self.counter])
+            self.old_message = await self.channel.send(embed=await resolve_page(self.embed_list[self.counter]))
             for emoji in self.PAGINATION_EMOJI:
                 await self.old_message.add_reaction(emoji)
             await self.pager()
@@ -65,13 +71,13 @@ class Paginator:
 
     async def first(self):
         self.counter = 0
-        await self.old_message.edit(embed=self.embed_list[self.counter])
+        await self.old_message.edit(embed=await resolve_page(self.embed_list[self.counter]))
         return True
 
     async def previous(self):
         if self.counter != 0:
             self.counter -= 1
-            await self.old_message.edit(embed=self.embed_list[self.counter])
+            await self.old_message.edit(embed=await resolve_page(self.embed_list[self.counter]))
         return True
 
     async def stop_pagination(self):
@@ -83,10 +89,10 @@ class Paginator:
     async def next(self):
         if self.counter < len(self.embed_list) - 1:
             self.counter += 1
-            await self.old_message.edit(embed=self.embed_list[self.counter])
+            await self.old_message.edit(embed=await resolve_page(self.embed_list[self.counter]))
         return True
 
     async def end(self):
         self.counter = len(self.embed_list) - 1
-        await self.old_message.edit(embed=self.embed_list[self.counter])
+        await self.old_message.edit(embed=await resolve_page(self.embed_list[self.counter]))
         return True
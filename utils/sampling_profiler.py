@@ -0,0 +1,77 @@
+import os
+import sys
+import time
+from collections import Counter
+
+# Leaf frames of a loop waiting on IO, uvloop's waits happen in C under run_until_complete
+IDLE_FUNCTIONS = {'select', 'poll', 'epoll', 'kqueue', 'run_forever', 'run_until_complete'}
+
+
+class StackSampler:
+    """
+        Samples the stack of one thread (the event loop's) from a separate thread via
+        sys._current_frames, so nothing is traced and the profiled code runs at full speed.
+        Results come out in the collapsed stack format flamegraph.pl / speedscope read,
+        plus how many samples landed in each cog.
+    """
+
+    def __init__(self, thread_id: int, interval: float = 0.005):
+        """
+        :param thread_id: threading.get_ident() of the thread to sample.
+        :param interval: Seconds between samples.
+        """
+        self.thread_id = thread_id
+        self.interval = interval
+        self.stacks = Counter()
+        self.cogs = Counter()
+        self.samples = 0
+        self._root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+    def _location(self, code) -> str:
+        filename = code.co_filename
+        if filename.startswith(self._root):
+            filename = os.path.relpath(filename, self._root)
+        else:
+            filename = os.path.basename(filename)
+        return f"{filename}:{code.co_name}"
+
+    @staticmethod
+    def _cog_of(filename: str):
+        """ 'cogs.nsfw' for .../cogs/nsfw.py, None for anything outside a cogs folder """
+        parts = filename.replace('\\', '/').split('/')
+        if len(parts) > 1 and parts[-2] == 'cogs':
+            package = 'realms.cogs' if len(parts) > 2 and parts[-3].lower() == 'realms' else 'cogs'
+            return f"{package}.{parts[-1][:-3]}"
+        return None
+
+    def _sample(self, frame):
+        stack, cog = [], None
+        while frame is not None:
+            code = frame.f_code
+            stack.append(self._location(code))
+            cog = self._cog_of(code.co_filename) or cog  # Ends on the outermost cog frame
+            frame = frame.f_back
+        stack.reverse()
+        self.stacks[";".join(stack)] += 1
+        if cog is not None:
+            self.cogs[cog] += 1
+        elif stack and stack[-1].rsplit(':', 1)[-1] in IDLE_FUNCTIONS:
+            self.cogs['<idle>'] += 1
+        else:
+            self.cogs['<bot core>'] += 1
+        self.samples += 1
+
+    def run(self, duration: float):
+        """ Blocks for `duration` seconds while sampling, run it off the sampled thread """
+        end = time.perf_counter() + duration
+        while time.perf_counter() < end:
+            frame = sys._current_frames().get(self.thread_id)
+            if frame is not None:
+                self._sample(frame)
+            del frame
+            time.sleep(self.interval)
+        return self
+
+    def collapsed(self) -> str:
+        """ `frame;frame;frame count` lines, feed to flamegraph.pl or drop into speedscope """
+        return "\n".join(f"{stack} {count}" for stack, count in self.stacks.most_common()) + "\n"